@@ -1,9 +1,10 @@
-from magicbot import AutonomousStateMachine, state, timed_state
+from magicbot import state, timed_state
 
 from components.drivetrain import Drivetrain
+from tracing import TracedAutonomousStateMachine
 
 
-class DelayLeave(AutonomousStateMachine):
+class DelayLeave(TracedAutonomousStateMachine):
     MODE_NAME = "delay_leave"
 
     drivetrain: Drivetrain
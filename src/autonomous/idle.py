@@ -1,9 +1,10 @@
-from magicbot import AutonomousStateMachine, timed_state
+from magicbot import timed_state
 
 from components.drivetrain import Drivetrain
+from tracing import TracedAutonomousStateMachine
 
 
-class Idle(AutonomousStateMachine):
+class Idle(TracedAutonomousStateMachine):
     MODE_NAME = "Idle"
     DEFAULT = True
 
@@ -1,12 +1,13 @@
-from magicbot import AutonomousStateMachine, state, timed_state
+from magicbot import state, timed_state
 
 from components.drivetrain import Drivetrain
 from components.drive_control import DriveControl
 from components.shooter_control import ShooterControl
 from components.vision import Vision
+from tracing import TracedAutonomousStateMachine
 
 
-class OneNote(AutonomousStateMachine):
+class OneNote(TracedAutonomousStateMachine):
     MODE_NAME = "One Note"
 
     drive_control: DriveControl
@@ -0,0 +1,11 @@
+import os
+
+import wpilib
+
+from routine import load_routines
+
+# expose each compiled routine so that it is found as an autonomous mode
+globals().update(
+    (routine.__name__, routine)
+    for routine in load_routines(os.path.join(wpilib.getDeployDirectory(), "routines"))
+)
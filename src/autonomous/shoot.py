@@ -1,10 +1,11 @@
-from magicbot import AutonomousStateMachine, state, timed_state
+from magicbot import state, timed_state
 
 from components.shooter_control import ShooterControl
 from components.drivetrain import Drivetrain
+from tracing import TracedAutonomousStateMachine
 
 
-class Shoot(AutonomousStateMachine):
+class Shoot(TracedAutonomousStateMachine):
     MODE_NAME = "Shoot"
 
     shooter_control: ShooterControl
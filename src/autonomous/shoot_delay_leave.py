@@ -1,10 +1,11 @@
-from magicbot import AutonomousStateMachine, state, timed_state
+from magicbot import state, timed_state
 
 from components.drivetrain import Drivetrain
 from components.shooter_control import ShooterControl
+from tracing import TracedAutonomousStateMachine
 
 
-class Shoot_DelayLeave(AutonomousStateMachine):
+class Shoot_DelayLeave(TracedAutonomousStateMachine):
     MODE_NAME = "shoot_delay_leave"
 
     drivetrain: Drivetrain
@@ -1,10 +1,11 @@
-from magicbot import AutonomousStateMachine, state, timed_state
+from magicbot import state, timed_state
 
 from components.shooter_control import ShooterControl
 from components.drivetrain import Drivetrain
+from tracing import TracedAutonomousStateMachine
 
 
-class Shootnoleave(AutonomousStateMachine):
+class Shootnoleave(TracedAutonomousStateMachine):
     MODE_NAME = "Shoot_No_Leave"
 
     shooter_control: ShooterControl
@@ -13,6 +14,7 @@ class Shootnoleave(AutonomousStateMachine):
     @timed_state(duration=2, first=True, next_state="stopped")
     def shooting(self):
         self.shooter_control.engage(initial_state="loading")
+
     @state
     def stopped(self):
         self.drivetrain.arcade_drive(0, 0)
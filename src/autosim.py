@@ -0,0 +1,241 @@
+"""Runs every autonomous mode in the simulator, headless and faster than
+real time, and reports how each one went:
+
+    python autosim.py [--jobs N] [--duration S] [--json FILE] [MODE ...]
+
+Each mode runs in a fresh worker process, since the HAL only supports
+one robot per process. For each mode the report lists the time taken to
+finish (the mode enters `stopped` or stops executing), the number of
+notes scored (shots taken by `ShooterControl`), and the time spent in
+each state of the mode.
+"""
+
+import argparse
+import importlib
+import inspect
+import json
+import multiprocessing
+import os
+import pathlib
+
+ROBOT_DIR = pathlib.Path(__file__).resolve().parent
+# a mode has finished once it enters one of these states ("" means that
+# it stopped executing)
+STOPPED_STATES = ("stopped", "stopping", "")
+
+
+def find_modes() -> list[str]:
+    """Returns the names of the modes in `autonomous`, found the same way
+    as magicbot's `AutonomousModeSelector` finds them
+    """
+    names = []
+    for filename in sorted(os.listdir(ROBOT_DIR / "autonomous")):
+        if not filename.endswith(".py") or filename.startswith("_"):
+            continue
+        module = importlib.import_module(f"autonomous.{filename[:-3]}")
+        for _, obj in inspect.getmembers(module, inspect.isclass):
+            name = getattr(obj, "MODE_NAME", None)
+            if name is not None and name not in names:
+                names.append(name)
+    return names
+
+
+def get_state_times(tracer, end: float) -> dict[str, float]:
+    """Returns the total time spent in each state, including the time
+    spent so far in the current one
+    """
+    times = {name: total for name, (_, total, _) in tracer.get_dwell_stats().items()}
+    if tracer.state != -1:
+        name = tracer.state_names[tracer.state]
+        times[name] = times.get(name, 0.0) + end - tracer.entered
+    return times
+
+
+def empty_result(name: str) -> dict:
+    return {
+        "mode": name,
+        "completion_time": None,
+        "notes_scored": 0,
+        "states": {},
+        "final_state": None,
+        "error": None,
+    }
+
+
+def run_mode(name: str, duration: float = 15.0, setup=None) -> dict:
+    """Runs the autonomous mode `name` for `duration` seconds of
+    simulated time. `setup`, if given, is called with the robot and the
+    physics engine (`None` without `physics.py`) once the robot is
+    initialized, before autonomous is enabled.
+    """
+    # imported here so that each worker sets up its own HAL
+    import gc
+    import threading
+
+    import hal.simulation
+    import ntcore
+    import wpilib
+    import wpilib.shuffleboard
+    import wpilib.simulation
+    from wpilib.simulation import (
+        DriverStationSim,
+        pauseTiming,
+        restartTiming,
+        stepTimingAsync,
+    )
+    from pyfrc.physics.core import PhysicsInterface
+
+    from robot import MyRobot
+    from sim.clock import SimClock
+
+    os.chdir(ROBOT_DIR)
+    physics, robot_class = PhysicsInterface._create_and_attach(MyRobot, ROBOT_DIR)
+    initialized = threading.Event()
+    errors = []
+
+    class SimRobot(robot_class):
+        def robotInit(self):
+            try:
+                super().robotInit()
+            finally:
+                initialized.set()
+
+    nt = ntcore.NetworkTableInstance.getDefault()
+    nt.startLocal()
+    pauseTiming()
+    restartTiming()
+    clock = SimClock()
+    wpilib.DriverStation.silenceJoystickConnectionWarning(True)
+    DriverStationSim.setAutonomous(False)
+    DriverStationSim.setEnabled(False)
+    DriverStationSim.notifyNewData()
+
+    robot = SimRobot()
+
+    def run_robot():
+        try:
+            robot.startCompetition()
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run_robot, daemon=True)
+    thread.start()
+    result = empty_result(name)
+    mode = None
+    try:
+        # no deadline, since startup is slow when every core is busy
+        initialized.wait()
+        thread.join(0.1)
+        if errors:
+            raise errors.pop()
+        clock.step(0.4, enabled=False)
+        mode = robot._automodes.modes[name]
+        robot._automodes.chooser.setDefaultOption(name, mode)
+        if setup is not None:
+            setup(robot, physics.engine if physics else None)
+        start = wpilib.Timer.getFPGATimestamp()
+        clock.step(duration, enabled=True)
+        end = wpilib.Timer.getFPGATimestamp()
+
+        for state, time in mode.tracer.get_transitions():
+            if state in STOPPED_STATES:
+                result["completion_time"] = time - start
+                break
+        result["notes_scored"] = sum(
+            1
+            for state, _ in robot.shooter_control.tracer.get_transitions()
+            if state == "shooting"
+        )
+        result["states"] = get_state_times(mode.tracer, end)
+        result["final_state"] = mode.current_state
+        clock.step(0.2, enabled=False)
+    except Exception as e:
+        errors.append(e)
+    finally:
+        if thread.is_alive():
+            robot.endCompetition()
+            # lets the robot loop notice that it has been ended
+            stepTimingAsync(1.0)
+            thread.join()
+    if errors:
+        result["error"] = repr(errors[0])
+
+    # the same cleanup as pyfrc's test fixture, without which the worker
+    # process hangs on exit
+    wpilib.simulation._simulation._resetMotorSafety()
+    del robot, mode
+    gc.collect()
+    nt.stopLocal()
+    nt._reset()
+    wpilib.simulation._simulation._resetWpilibSimulationData()
+    wpilib._wpilib._clearSmartDashboardData()
+    wpilib.shuffleboard._shuffleboard._clearShuffleboardData()
+    hal.simulation.cancelAllSimPeriodicCallbacks()
+    hal.simulation.resetGlobalHandles()
+    hal.simulation.resetAllSimData()
+    return result
+
+
+def _run(args: tuple) -> dict:
+    return run_mode(*args)
+
+
+def run_all(pool, tasks: list[tuple], timeout: float) -> list[dict]:
+    """Runs `run_mode(*task)` for each task on `pool`. The simulator
+    occasionally aborts a worker while it starts up, and the pool never
+    returns a result for a task whose worker died, so a task that takes
+    longer than `timeout` seconds is retried once before giving up on it.
+    """
+    pending = [pool.apply_async(_run, (task,)) for task in tasks]
+    results = []
+    for task, result in zip(tasks, pending):
+        try:
+            results.append(result.get(timeout))
+            continue
+        except multiprocessing.TimeoutError:
+            pass
+        try:
+            results.append(pool.apply_async(_run, (task,)).get(timeout))
+        except multiprocessing.TimeoutError:
+            result = empty_result(task[0])
+            result["error"] = "worker died or timed out"
+            results.append(result)
+    return results
+
+
+def print_report(results: list[dict]) -> None:
+    for result in results:
+        time = result["completion_time"]
+        finished = "did not finish" if time is None else f"finished in {time:.2f} s"
+        print(f"{result['mode']}: {finished}, notes scored: {result['notes_scored']}")
+        if result["error"] is not None:
+            print(f"    error: {result['error']}")
+        for state, total in result["states"].items():
+            print(f"    {state:<20} {total:6.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modes", nargs="*", help="modes to run (default: all)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument(
+        "--timeout", type=float, default=60.0, help="real time allowed per mode"
+    )
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    modes = args.modes or find_modes()
+    # spawned rather than forked, so no HAL state is inherited
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(args.jobs, maxtasksperchild=1) as pool:
+        results = run_all(pool, [(mode, args.duration) for mode in modes], args.timeout)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,44 @@ from wpilib import MotorControllerGroup,DigitalInput
 from magicbot import will_reset_to, tunable, feedback
 from rev import CANSparkBase, CANSparkMax
 
+from motorconfig import MotorConfig
+
+# change in a target (rotations) worth sending to a Spark Max, and the
+# error within which Smart Motion holds its position
+SYNC_TOLERANCE = 0.5
+# distance (rotations) past the limit switch of the soft limit on the
+# contract side, so that an arm whose encoder has drifted still reaches
+# its switch and is zeroed again
+CONTRACT_OVERTRAVEL = 10.0
+
 
 class Climber:
+    """Component that controls the two climber arms. Each arm can be
+    driven on its own at `speed`, or both can be moved together to a
+    height with `set_height()` (and `extend()`/`contract()`): each Spark
+    Max moves its arm to the target height with Smart Motion, which runs
+    a trapezoidal profile and velocity PID onboard, kept within its soft
+    limits. The Spark Maxes cannot see each other's encoders, so a
+    cross-coupling term holds back the target of the arm that is ahead
+    and pushes on the one behind so that the two stay level. A target is
+    only sent when it changes.
+
+    Heights are in motor rotations, 0 when contracted. The left arm
+    counts down as it extends and the right arm counts up. Each arm has
+    a normally open limit switch at the bottom, which pulls its input
+    low when pressed, and its encoder is zeroed when it is pressed.
+    The encoders read 0 wherever the arms are at boot, so the soft limit
+    on the contract side of an arm is only enabled once its switch has
+    zeroed it, and is `CONTRACT_OVERTRAVEL` past the switch.
+    """
+
     left_motor: CANSparkMax
     right_motor: CANSparkMax
     left_lower_limit: float
     left_upper_limit: float
     right_lower_limit: float
     right_upper_limit: float
+    motor_config: MotorConfig
 
 
     contracting_right = will_reset_to(False)
@@ -17,23 +47,100 @@ class Climber:
     extending_left = will_reset_to(False)
     extending_right = will_reset_to(False)
     ignoring_limits = will_reset_to(False)
+    # height both arms move to together, if any
+    height_goal = will_reset_to(None)
     speed = tunable(1)
+    # Smart Motion velocity PID: feedforward of 1 / the NEO's free speed
+    # (RPM)
+    velocity_kP = tunable(0.0002)
+    velocity_kFF = tunable(0.000176)
+    # rotations/s and rotations/s^2 of the Smart Motion profiles
+    max_velocity = tunable(60)
+    max_acceleration = tunable(120)
+    # fraction of the height difference taken off the leading arm's
+    # setpoint
+    sync_kC = tunable(0.5)
+    left_limit_pressed = False
+    right_limit_pressed = False
+    left_position = 0
+    right_position = 0
+    left_output = 0
+    right_output = 0
+    # targets (rotations) sent to Smart Motion instead of outputs, and
+    # the targets last sent
+    left_reference = None
+    right_reference = None
+    sent_left_reference = None
+    sent_right_reference = None
+    # whether each arm has been zeroed by its limit switch
+    left_homed = False
+    right_homed = False
+    # gains and constraints last sent to the Spark Maxes
+    sent_gains = None
 
     def setup(self):
-        self.left_motor.setIdleMode(CANSparkBase.IdleMode.kBrake)
-        self.right_motor.setIdleMode(CANSparkBase.IdleMode.kBrake)
+        config = self.motor_config
+        config.add(self.left_motor, "setIdleMode", CANSparkBase.IdleMode.kBrake)
+        config.add(self.right_motor, "setIdleMode", CANSparkBase.IdleMode.kBrake)
         self.left_encoder = self.left_motor.getEncoder()
         self.right_encoder = self.right_motor.getEncoder()
         self.climber_left_limit_switch = DigitalInput(4)
         self.climber_right_limit_switch = DigitalInput(5)
+        self.last_left_limit_pressed = False
+        self.last_right_limit_pressed = False
+
+        # the left arm contracts forward and the right arm in reverse
+        forward = CANSparkBase.SoftLimitDirection.kForward
+        reverse = CANSparkBase.SoftLimitDirection.kReverse
+        for motor, extend, extend_limit, contract, contract_limit in (
+            (
+                self.left_motor,
+                reverse,
+                self.left_lower_limit,
+                forward,
+                self.left_upper_limit + CONTRACT_OVERTRAVEL,
+            ),
+            (
+                self.right_motor,
+                forward,
+                self.right_upper_limit,
+                reverse,
+                self.right_lower_limit - CONTRACT_OVERTRAVEL,
+            ),
+        ):
+            config.add(motor, "setSoftLimit", extend, extend_limit)
+            config.add(motor, "enableSoftLimit", extend, True)
+            # enabled by `flush()` once the arm is zeroed
+            config.add(motor, "setSoftLimit", contract, contract_limit)
+            config.add(motor, "enableSoftLimit", contract, False)
+        self.left_pid = self.left_motor.getPIDController()
+        self.right_pid = self.right_motor.getPIDController()
+        gains = self.get_gains()
+        for motor, pid in (
+            (self.left_motor, self.left_pid),
+            (self.right_motor, self.right_pid),
+        ):
+            for setting, *args in self.get_gain_settings(gains):
+                config.add(motor, setting, *args, target=pid)
+            config.add(
+                motor,
+                "setSmartMotionAllowedClosedLoopError",
+                SYNC_TOLERANCE,
+                target=pid,
+            )
+        self.sent_gains = gains
+        self.max_height = min(
+            self.right_upper_limit - self.right_lower_limit,
+            self.left_upper_limit - self.left_lower_limit,
+        )
 
     @feedback
     def get_left_position(self):
-        return self.left_encoder.getPosition()
+        return self.left_position
 
     @feedback
     def get_right_position(self):
-        return self.right_encoder.getPosition()
+        return self.right_position
 
     def contract_left(self):
         self.contracting_left = True
@@ -42,8 +149,7 @@ class Climber:
         self.contracting_right = True
 
     def contract(self):
-        self.contracting_left = True
-        self.contracting_right = True
+        self.height_goal = 0
 
     def extend_left(self):
         self.extending_left = True
@@ -52,33 +158,143 @@ class Climber:
         self.extending_right = True
 
     def extend(self):
-        self.extending_right = True
-        self.extending_left = True
+        self.height_goal = self.max_height
+
+    def set_height(self, height: float):
+        """Moves both arms together to `height` (rotations). Must be
+        called every loop.
+        """
+        self.height_goal = min(max(height, 0), self.max_height)
+
+    def get_left_height(self) -> float:
+        return -self.left_position
+
+    def get_right_height(self) -> float:
+        return self.right_position
+
+    def get_gains(self) -> tuple:
+        return (
+            self.velocity_kP,
+            self.velocity_kFF,
+            self.speed,
+            self.max_velocity,
+            self.max_acceleration,
+        )
+
+    def get_gain_settings(self, gains: tuple) -> list[tuple]:
+        """Returns the calls that send `gains` to a Spark Max's PID
+        controller
+        """
+        kP, kFF, speed, max_velocity, max_acceleration = gains
+        return [
+            ("setP", kP),
+            ("setFF", kFF),
+            ("setOutputRange", -speed, speed),
+            # Smart Motion takes RPM
+            ("setSmartMotionMaxVelocity", max_velocity * 60),
+            ("setSmartMotionMaxAccel", max_acceleration * 60),
+        ]
+
+    def refresh_tunables(self):
+        """Sends changes made to the Smart Motion tunables from the
+        dashboard to the Spark Maxes
+        """
+        gains = self.get_gains()
+        if gains == self.sent_gains:
+            return
+        for pid in (self.left_pid, self.right_pid):
+            for setting, *args in self.get_gain_settings(gains):
+                getattr(pid, setting)(*args)
+        self.sent_gains = gains
+
+    def on_enable(self):
+        # the Spark Maxes may have been given other commands since
+        self.sent_left_reference = None
+        self.sent_right_reference = None
+
+    def read(self):
+        """Read phase: polls the limit switches and encoders"""
+        self.left_limit_pressed = not self.climber_left_limit_switch.get()
+        self.right_limit_pressed = not self.climber_right_limit_switch.get()
+        self.left_position = self.left_encoder.getPosition()
+        self.right_position = self.right_encoder.getPosition()
 
     def execute(self):
-        if self.climber_left_limit_switch.get():
-            self.left_encoder.setPosition(0)
-            print (self.climber_left_limit_switch.get())
-        if self.climber_right_limit_switch.get():
-            self.right_encoder.setPosition(0)
+        if self.left_limit_pressed:
+            self.left_position = 0
+        if self.right_limit_pressed:
+            self.right_position = 0
+        self.left_reference = None
+        self.right_reference = None
+        if self.height_goal is not None:
+            self.left_output = 0
+            self.right_output = 0
+            self.execute_synced()
+            return
         if self.contracting_left and self.extending_left:
             self.extending_left = False
 
         if self.contracting_right and self.extending_right:
             self.extending_right = False
 
-        if self.extending_left and self.climber_left_limit_switch.get() != False:
-            self.left_motor.set(-self.speed)
-        elif self.contracting_left and (
-            self.get_left_position() < self.left_upper_limit):
-            self.left_motor.set(self.speed)
+        # each arm contracts until it presses its limit switch and
+        # extends until it reaches its limit
+        if self.extending_left and self.left_position > self.left_lower_limit:
+            self.left_output = -self.speed
+        elif self.contracting_left and not self.left_limit_pressed:
+            self.left_output = self.speed
         else:
-            self.left_motor.set(0)
+            self.left_output = 0
 
-        if self.contracting_right and self.climber_left_limit_switch.get() != False:
-            self.right_motor.set(-self.speed)
-        elif self.extending_right and (
-            self.get_right_position() < self.right_upper_limit):
-            self.right_motor.set(self.speed)
+        if self.contracting_right and not self.right_limit_pressed:
+            self.right_output = -self.speed
+        elif self.extending_right and self.right_position < self.right_upper_limit:
+            self.right_output = self.speed
         else:
-            self.right_motor.set(0)
+            self.right_output = 0
+
+    def execute_synced(self):
+        skew = self.get_left_height() - self.get_right_height()
+        self.left_reference = -(self.height_goal - self.sync_kC * skew)
+        self.right_reference = self.height_goal + self.sync_kC * skew
+
+    def flush(self):
+        """Write phase: zeroes the encoders when the limit switches are
+        pressed and sends the outputs or targets computed in `execute()`
+        """
+        if self.left_limit_pressed and not self.last_left_limit_pressed:
+            self.left_encoder.setPosition(0)
+            if not self.left_homed:
+                self.left_motor.enableSoftLimit(
+                    CANSparkBase.SoftLimitDirection.kForward, True
+                )
+                self.left_homed = True
+        if self.right_limit_pressed and not self.last_right_limit_pressed:
+            self.right_encoder.setPosition(0)
+            if not self.right_homed:
+                self.right_motor.enableSoftLimit(
+                    CANSparkBase.SoftLimitDirection.kReverse, True
+                )
+                self.right_homed = True
+        self.last_left_limit_pressed = self.left_limit_pressed
+        self.last_right_limit_pressed = self.right_limit_pressed
+        if self.left_reference is not None:
+            smart_motion = CANSparkBase.ControlType.kSmartMotion
+            if (
+                self.sent_left_reference is None
+                or abs(self.left_reference - self.sent_left_reference) > SYNC_TOLERANCE
+            ):
+                self.left_pid.setReference(self.left_reference, smart_motion)
+                self.sent_left_reference = self.left_reference
+            if (
+                self.sent_right_reference is None
+                or abs(self.right_reference - self.sent_right_reference)
+                > SYNC_TOLERANCE
+            ):
+                self.right_pid.setReference(self.right_reference, smart_motion)
+                self.sent_right_reference = self.right_reference
+            return
+        self.sent_left_reference = None
+        self.sent_right_reference = None
+        self.left_motor.set(self.left_output)
+        self.right_motor.set(self.right_output)
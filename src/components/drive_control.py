@@ -2,23 +2,22 @@ import numpy as np
 
 from wpilib import DriverStation
 import wpimath.controller
-import magicbot
 from magicbot.state_machine import state, timed_state
 from magicbot import tunable, will_reset_to, feedback
-import navx
 
 from components.drivetrain import Drivetrain
 from components.vision import Vision
+from tracing import TracedStateMachine
 import util
 
 
-class DriveControl(magicbot.StateMachine):
+class DriveControl(TracedStateMachine):
     # other components
     drivetrain: Drivetrain
     vision: Vision
 
     # variables to be injected
-    gyro: navx.AHRS
+    shot_table: util.LookupTable
 
     turn_to_angle_kP = tunable(0.01)
     turn_to_angle_kI = tunable(0)
@@ -56,15 +55,20 @@ class DriveControl(magicbot.StateMachine):
     def get_manually_aligned(self):
         """Returns true if the bot is predicted to be able to score a note
         based on its distance and angle to the tag. This uses a more
-        generous tolerance than the PIDs.
+        generous tolerance than the PIDs. Any distance covered by
+        `shot_table` is accepted.
         """
         vision_x = self.vision.getX()
         if not self.vision.hasTargets() or vision_x is None:
             return False
-        return (
+        if (
             abs(self.vision.get_adjusted_heading())
-            < self.turn_to_angle_tP * self.manual_tolerance_scalar
-            and abs(vision_x - self.drive_from_tag_setpoint)
+            >= self.turn_to_angle_tP * self.manual_tolerance_scalar
+        ):
+            return False
+        return (
+            self.shot_table.contains(vision_x)
+            or abs(vision_x - self.drive_from_tag_setpoint)
             < self.drive_from_tag_tP * self.manual_tolerance_scalar
         )
 
@@ -94,7 +98,7 @@ class DriveControl(magicbot.StateMachine):
         theta = self.vision.getAdjustedHeading()  # - latency * turn_rate
         if theta is None:
             return
-        self.set_angle(self.gyro.getAngle() + theta)
+        self.set_angle(self.drivetrain.get_angle() + theta)
 
     @state(first=True)
     def free(self):
@@ -121,7 +125,7 @@ class DriveControl(magicbot.StateMachine):
             self.turn_to_angle_tP, self.turn_to_angle_tV
         )
 
-        measurement = self.gyro.getAngle()
+        measurement = self.drivetrain.get_angle()
         output = self.turn_to_angle_controller.calculate(measurement)
         print(
             f"r: {self.turn_to_angle_controller.getSetpoint()}, y: {measurement}, e: {self.turn_to_angle_controller.getPositionError()}, u: {output}"
@@ -157,7 +161,7 @@ class DriveControl(magicbot.StateMachine):
             self.turn_to_angle_tP, self.turn_to_angle_tV
         )
 
-        measurement = self.gyro.getAngle()
+        measurement = self.drivetrain.get_angle()
         output = self.turn_to_angle_controller.calculate(measurement)
         if output > 0:
             output += self.drivetrain_kS
@@ -171,7 +175,12 @@ class DriveControl(magicbot.StateMachine):
         """
         self.drivetrain.arcade_drive(0, util.clamp(-output, -0.5, 0.5))
         if self.turn_to_angle_controller.atSetpoint():
-            self.next_state("spacing")
+            # no need to drive to the setpoint if a shot can be taken here
+            vision_x = self.vision.getX()
+            if vision_x is not None and self.shot_table.contains(vision_x):
+                self.next_state("settling")
+            else:
+                self.next_state("spacing")
 
     @state
     def spacing(self):
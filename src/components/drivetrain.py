@@ -1,11 +1,27 @@
+import math
+
 import wpilib
 from wpilib.interfaces import MotorController
 from wpilib.drive import DifferentialDrive
-from magicbot import will_reset_to
+from wpimath.geometry import Pose2d, Rotation2d
+from wpimath.kinematics import (
+    ChassisSpeeds,
+    DifferentialDriveKinematics,
+    DifferentialDriveOdometry,
+)
+from magicbot import will_reset_to, tunable, feedback
 from rev import CANSparkBase, CANSparkMax
+import navx
 
+from motorconfig import MotorConfig
 import util
 
+# KitBot chassis: 6 in wheels driven through 8.45:1 gearboxes
+TRACK_WIDTH = 0.546
+WHEEL_DIAMETER = 0.1524
+GEAR_RATIO = 8.45
+METERS_PER_ROTATION = math.pi * WHEEL_DIAMETER / GEAR_RATIO
+
 
 class Drivetrain:
     # annotate motor and configuration instances
@@ -14,15 +30,41 @@ class Drivetrain:
     back_left_motor: CANSparkMax
     back_right_motor: CANSparkMax
 
+    gyro: navx.AHRS
+    motor_config: MotorConfig
+
     # values will reset to 0 after every time control loop runs
     forward = will_reset_to(0)
     turn = will_reset_to(0)
+    # chassis speeds requested by `follow()`, which take priority over
+    # `arcade_drive()`
+    speeds = will_reset_to(None)
+
+    # feedforward (V, V/(m/s)) and wheel velocity feedback (V/(m/s))
+    # used to track the speeds given to `follow()`
+    kS = tunable(0.15)
+    kV = tunable(2.6)
+    kP = tunable(1.0)
+
+    kinematics = DifferentialDriveKinematics(TRACK_WIDTH)
+    left_position = 0.0
+    right_position = 0.0
+    left_velocity = 0.0
+    right_velocity = 0.0
+    left_voltage = None
+    right_voltage = None
+    # scales every output sent to the motors, so that weaker or stronger
+    # motors can be simulated
+    output_gain = 1.0
 
     def setup(self):
-        self.front_left_motor.setIdleMode(CANSparkBase.IdleMode.kCoast)
-        self.front_right_motor.setIdleMode(CANSparkBase.IdleMode.kCoast)
-        self.back_left_motor.setIdleMode(CANSparkBase.IdleMode.kCoast)
-        self.back_right_motor.setIdleMode(CANSparkBase.IdleMode.kCoast)
+        for motor in (
+            self.front_left_motor,
+            self.front_right_motor,
+            self.back_left_motor,
+            self.back_right_motor,
+        ):
+            self.motor_config.add(motor, "setIdleMode", CANSparkBase.IdleMode.kCoast)
         self.left_motor_controller_group = wpilib.MotorControllerGroup(
             self.front_left_motor, self.back_left_motor
         )
@@ -34,6 +76,37 @@ class Drivetrain:
             self.left_motor_controller_group, self.right_motor_controller_group
         )
 
+        self.left_encoder = self.front_left_motor.getEncoder()
+        self.right_encoder = self.front_right_motor.getEncoder()
+        for motor, encoder in (
+            (self.front_left_motor, self.left_encoder),
+            (self.front_right_motor, self.right_encoder),
+        ):
+            self.motor_config.add(
+                motor,
+                "setPositionConversionFactor",
+                METERS_PER_ROTATION,
+                target=encoder,
+            )
+            self.motor_config.add(
+                motor,
+                "setVelocityConversionFactor",
+                METERS_PER_ROTATION / 60,
+                target=encoder,
+            )
+        self.pose = Pose2d()
+        self.angle = 0.0
+
+    def on_configured(self):
+        """Called once the motor controllers are configured, so that the
+        encoders read in meters
+        """
+        self.odometry = DifferentialDriveOdometry(
+            self.gyro.getRotation2d(),
+            self.left_encoder.getPosition(),
+            -self.right_encoder.getPosition(),
+        )
+
     def on_enable(self):
         self.drive.setSafetyEnabled(True)
 
@@ -46,6 +119,38 @@ class Drivetrain:
         self.forward = forward
         self.turn = turn
 
+    def follow(self, speeds: ChassisSpeeds):
+        """Drives at `speeds` (m/s, rad/s) using closed-loop wheel
+        velocity control. Used for following trajectories.
+        """
+        self.speeds = speeds
+
+    def get_angle(self) -> float:
+        """Returns the gyro angle read this loop (degrees, clockwise
+        positive)
+        """
+        return self.angle
+
+    def get_pose(self) -> Pose2d:
+        """Returns the position of the robot as tracked by odometry since
+        the last `reset_pose()`
+        """
+        return self.pose
+
+    def reset_pose(self, pose: Pose2d = Pose2d()):
+        self.odometry.resetPosition(
+            self.gyro.getRotation2d(), self.left_position, self.right_position, pose
+        )
+        self.pose = pose
+
+    @feedback
+    def get_x(self) -> float:
+        return self.pose.X()
+
+    @feedback
+    def get_y(self) -> float:
+        return self.pose.Y()
+
     def set_coast(self):
         self.front_left_motor.setIdleMode(CANSparkBase.IdleMode.kCoast)
         self.front_right_motor.setIdleMode(CANSparkBase.IdleMode.kCoast)
@@ -58,5 +163,49 @@ class Drivetrain:
         self.back_left_motor.setIdleMode(CANSparkBase.IdleMode.kBrake)
         self.back_right_motor.setIdleMode(CANSparkBase.IdleMode.kBrake)
 
+    def read(self):
+        """Read phase: reads the encoders and the gyro and updates
+        odometry
+        """
+        # the right side is inverted, so its encoders count backwards
+        self.left_position = self.left_encoder.getPosition()
+        self.right_position = -self.right_encoder.getPosition()
+        self.left_velocity = self.left_encoder.getVelocity()
+        self.right_velocity = -self.right_encoder.getVelocity()
+        self.angle = self.gyro.getAngle()
+        # the navX's angle is clockwise positive
+        self.pose = self.odometry.update(
+            Rotation2d.fromDegrees(-self.angle),
+            self.left_position,
+            self.right_position,
+        )
+
     def execute(self):
-        self.drive.arcadeDrive(self.forward, self.turn)
+        if self.speeds is None:
+            self.left_voltage = None
+            self.right_voltage = None
+            return
+        wheel_speeds = self.kinematics.toWheelSpeeds(self.speeds)
+        self.left_voltage = self.get_voltage(wheel_speeds.left, self.left_velocity)
+        self.right_voltage = self.get_voltage(wheel_speeds.right, self.right_velocity)
+
+    def get_voltage(self, setpoint: float, velocity: float) -> float:
+        """Voltage needed to drive one side at `setpoint` (m/s)"""
+        if setpoint == 0:
+            return self.kP * -velocity
+        return (
+            self.kS * math.copysign(1, setpoint)
+            + self.kV * setpoint
+            + self.kP * (setpoint - velocity)
+        )
+
+    def flush(self):
+        """Write phase: sends the requested outputs to the motors"""
+        gain = self.output_gain
+        if self.left_voltage is None:
+            self.drive.arcadeDrive(self.forward * gain, self.turn * gain)
+        else:
+            self.left_motor_controller_group.setVoltage(self.left_voltage * gain)
+            self.right_motor_controller_group.setVoltage(self.right_voltage * gain)
+            # keeps motor safety from stopping the motors
+            self.drive.feed()
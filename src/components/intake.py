@@ -3,6 +3,7 @@ from wpilib.interfaces import MotorController
 from magicbot import tunable, will_reset_to, feedback
 from wpimath import controller, units, filter, trajectory
 
+from motorconfig import MotorConfig
 import util
 
 
@@ -21,6 +22,7 @@ class Intake:
         values are allowed to differ
     belt_motor -- MotorController of belt
     intake_indexer_motor -- Indexer neo550
+    motor_config -- Settings sent to the motor controllers at startup
     """
 
     joint_left_motor: MotorController
@@ -30,6 +32,7 @@ class Intake:
     left_encoder_offset: float
     right_encoder_offset: float
     belt_motor: util.WPI_TalonFX
+    motor_config: MotorConfig
 
     lower_limit = 0.0
     upper_limit = 0.41
@@ -45,6 +48,10 @@ class Intake:
     joint_voltage = will_reset_to(0)
     feedforward = controller.ArmFeedforward(0.24, 0.42, 0.78, 0.01)
     position = 0
+    belt_velocity = 0
+    filtered_motor_speed = 0
+    belt_output = 0
+    joint_output = None
 
     last_position = 0
     speed_filter = filter.MedianFilter(10)
@@ -59,7 +66,7 @@ class Intake:
 
 
     def setup(self):
-        self.joint_right_motor.setInverted(True)
+        self.motor_config.add(self.joint_right_motor, "setInverted", True)
         self.joint_motor_group = MotorControllerGroup(
             self.joint_left_motor, self.joint_right_motor
         )
@@ -83,7 +90,11 @@ class Intake:
         """
         if self.position is None:
             return None
-        return units.rotationsToRadians(-(self.position - self.horizontal_offset))
+        return self.to_radians(self.position)
+
+    def to_radians(self, position: float) -> units.radians:
+        """Converts a position to radians as returned by `get_radians()`"""
+        return units.rotationsToRadians(-(position - self.horizontal_offset))
 
     def convert_to_rotations(self, radians: units.radians) -> units.turns:
         """Converts radians to rotations with respect to the intake
@@ -104,10 +115,17 @@ class Intake:
         ) % 1
 
     def update_position(self) -> float | None:
+        """Measures the position and stores it. This is called every
+        loop by `read()`.
+        """
+        self.position = self.measure_position()
+        return self.position
+
+    def measure_position(self) -> float | None:
         """Returns the average position between the two encoders.
         If the difference between the two is greater than the given
         threshold, this function will return `None`, signifying an
-        error. Call this function every loop to update the position.
+        error. Unlike `update_position()`, the position is not stored.
         Position zero should be when the intake is in "up" position.
         """
         a = self.get_left_position()
@@ -115,16 +133,11 @@ class Intake:
         position = None
 
         if not self.left_encoder.isConnected() and not self.right_encoder.isConnected():
-            self.position = position
             return position
         if not self.left_encoder.isConnected():
-            position = b
-            self.position = position
-            return position
+            return b
         if not self.right_encoder.isConnected():
-            position = a
-            self.position = position
-            return position
+            return a
         if abs(a - b) <= self.encoder_error_tolerance:
             position = (a + b) / 2
         if (
@@ -134,7 +147,6 @@ class Intake:
             position = (a + b) / 2 - 0.5
             if position < 0:
                 position += 1
-        self.position = position
         return position
 
     def get_position(self) -> float | None:
@@ -177,8 +189,8 @@ class Intake:
 
     @feedback
     def get_filtered_motor_speed(self) -> float:
-        """Call continuously"""
-        return self.motor_speed_filter.calculate(self.belt_motor.get_velocity().value)
+        """Belt speed smoothed with a median filter, updated by `read()`"""
+        return self.filtered_motor_speed
 
     @feedback
     def get_joint_voltage(self) -> float:
@@ -189,20 +201,23 @@ class Intake:
         the encoders are misaligned. Note: this assumes that the
         position is closer to the lower limit than the upper limit.
         """
-        if self.position is None:
-            return True
-        midpoint = (util.cyclic_average(self.lower_limit, self.upper_limit) + 0.5) % 1
-        return util.cyclic_contains(self.position, self.lower_limit, midpoint)
+        return self.is_position_past(self.position, self.lower_limit)
 
     def is_past_upper_limit(self) -> bool:
         """Returns `True` if the position exceeds the lower limit or if
         the encoders are misaligned. Note: this assumes that the
         position is closer to the upper limit than the lower limit.
         """
-        if self.position is None:
+        return self.is_position_past(self.position, self.upper_limit)
+
+    def is_position_past(self, position: float | None, limit: float) -> bool:
+        """Returns `True` if `position` exceeds `limit` (the lower or
+        upper limit), or is `None`
+        """
+        if position is None:
             return True
         midpoint = (util.cyclic_average(self.lower_limit, self.upper_limit) + 0.5) % 1
-        return util.cyclic_contains(self.position, self.upper_limit, midpoint)
+        return util.cyclic_contains(position, limit, midpoint)
 
     @feedback
     def get_joint_setpoint(self) -> float:
@@ -283,38 +298,56 @@ class Intake:
     def override_disable(self):
         self.disabled = False
 
-    def execute(self):
-
+    def read(self):
+        """Read phase: polls the encoders and the belt motor"""
         self.last_position = self.position
+        self.update_position()
+        self.belt_velocity = self.belt_motor.get_velocity().value
+        self.filtered_motor_speed = self.motor_speed_filter.calculate(
+            self.belt_velocity
+        )
+
+    def refresh_tunables(self):
+        """Applies changes made to the joint tunables from the dashboard"""
         self.joint_PID.setP(self.joint_kP)
         self.joint_PID.setConstraints(
             trajectory.TrapezoidProfile.Constraints(
                 self.joint_max_velocity, self.joint_max_acceleration
             )
         )
+
+    def execute(self):
         if self.belt_intaking and self.belt_ejecting:
             self.belt_intaking = False
 
-        if self.disabled:
-            return
         if self.belt_intaking:
-            self.belt_motor.set(self.belt_speed)
+            self.belt_output = self.belt_speed
         elif self.belt_ejecting:
-            self.belt_motor.set(-self.belt_speed)
+            self.belt_output = -self.belt_speed
         else:
-            self.belt_motor.set(0)
+            self.belt_output = 0
 
+        # `None` stops the joint rather than holding 0 volts
+        self.joint_output = None
         if self.position is not None:
-            if (self.joint_voltage > 0 and self.is_past_lower_limit()) or (
-                self.joint_voltage < 0 and self.is_past_upper_limit()
+            if not (
+                (self.joint_voltage > 0 and self.is_past_lower_limit())
+                or (self.joint_voltage < 0 and self.is_past_upper_limit())
             ):
-                self.joint_motor_group.set(0)
-            else:
-                self.joint_motor_group.setVoltage(self.joint_voltage)
-        else:
-            self.joint_motor_group.set(0)
+                self.joint_output = self.joint_voltage
+        elif not self.disabled:
             print("ERROR: INTAKE ENCODERS MISALIGNED")
 
+    def flush(self):
+        """Write phase: sends the outputs computed in `execute()`"""
+        if self.disabled:
+            return
+        self.belt_motor.set(self.belt_output)
+        if self.joint_output is None:
+            self.joint_motor_group.set(0)
+        else:
+            self.joint_motor_group.setVoltage(self.joint_output)
+
     # extra feedback
     @feedback
     def get_upper_limit(self):
@@ -338,7 +371,7 @@ class Intake:
 
     @feedback
     def get_motor_speed(self):
-        return abs(self.belt_motor.get_velocity().value)
+        return abs(self.belt_velocity)
 
     @feedback
     def get_has_note(self):
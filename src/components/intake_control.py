@@ -1,11 +1,13 @@
-from magicbot import StateMachine, will_reset_to, tunable
+from magicbot import will_reset_to, tunable
 from magicbot.state_machine import state
 
 from components.intake import Intake
 from components.shooter import Shooter
+from handoff import IntakeState, NoteHandoff
+from tracing import TracedStateMachine
 
 
-class IntakeControl(StateMachine):
+class IntakeControl(TracedStateMachine):
     """State machine that controls the intake on the robot and makes its
     operation safer and easier
     """
@@ -14,6 +16,9 @@ class IntakeControl(StateMachine):
     intake: Intake
     shooter: Shooter
 
+    # variables to be injected
+    handoff: NoteHandoff
+
     """`joint_setpoint` is used instead of directly setting the setpoint
     of the PID controller because it ensures that the setpoint will only
     be changed once the state machine determines it is okay for the
@@ -24,7 +29,6 @@ class IntakeControl(StateMachine):
     intake_trigger = will_reset_to(False)
     eject_trigger = will_reset_to(False)
     leniency = tunable(0.2)
-    shooter_state = "idle"
 
     """Control methods
     Note that these are all prefixed with "request." This is because the
@@ -47,8 +51,13 @@ class IntakeControl(StateMachine):
     def request_eject(self):
         self.eject_trigger = True
 
-    def update_shooter_state(self, state: str):
-        self.shooter_state = state
+    def next_state(self, state):
+        super().next_state(state)
+        self.handoff.intake_state = IntakeState(state)
+
+    def done(self):
+        super().done()
+        self.handoff.intake_state = IntakeState.STOPPED
 
     # states
     @state(first=True)
@@ -4,6 +4,8 @@ from wpimath.filter import MedianFilter
 from magicbot import tunable, will_reset_to, feedback
 from rev import CANSparkMax
 
+from motorconfig import MotorConfig
+
 
 class Shooter:
     """Component that controls the two motors that shoot the notes"""
@@ -13,6 +15,7 @@ class Shooter:
     feed_right_motor: MotorController
     shooter_left_motor: MotorController
     shooter_right_motor: MotorController
+    motor_config: MotorConfig
 
     belt_intaking = will_reset_to(False)
     belt_ejecting = will_reset_to(False)
@@ -21,25 +24,41 @@ class Shooter:
     feeding_out = will_reset_to(False)
     feed_speed = tunable(-0.3)
     shooter_enabled = will_reset_to(False)
+    shot_speed = will_reset_to(None)
     source_intaking = will_reset_to(False)
+    prespinning = will_reset_to(False)
     shooter_speed = tunable(1)
+    # maximum output the flywheels may draw while waiting for a shot
+    prespin_speed = tunable(0.6)
     note_detection_threshold = tunable(3000)
     motor_speed_filter = MedianFilter(5)
+    belt_velocity = 0
+    filtered_motor_speed = 0
+    belt_output = 0
+    feed_output = 0
+    shooter_output = 0
 
     def setup(self):
-        self.feed_right_motor.setInverted(True)
+        self.motor_config.add(self.feed_right_motor, "setInverted", True)
         self.feed_motor_group = MotorControllerGroup(
             self.feed_left_motor, self.feed_right_motor
         )
-        self.shooter_right_motor.setInverted(True)
+        self.motor_config.add(self.shooter_right_motor, "setInverted", True)
         self.shooter_motor_group = MotorControllerGroup(
             self.shooter_left_motor, self.shooter_right_motor
         )
         self.belt_encoder = self.belt_motor.getEncoder()
 
+    def read(self):
+        """Read phase: polls the belt encoder"""
+        self.belt_velocity = self.belt_encoder.getVelocity()
+        self.filtered_motor_speed = self.motor_speed_filter.calculate(
+            self.belt_velocity
+        )
+
     @feedback
     def get_filtered_motor_speed(self):
-        return self.motor_speed_filter.calculate(self.belt_encoder.getVelocity())
+        return self.filtered_motor_speed
 
     def has_note(self) -> bool:
         """Returns `True` if a note is detected in the belt. This is
@@ -55,12 +74,30 @@ class Shooter:
     def eject(self):
         self.belt_ejecting = True
 
-    def shoot(self):
+    def shoot(self, speed: float | None = None):
+        """Spins the flywheels at `speed`, or at `shooter_speed` if no
+        speed is given
+        """
         self.shooter_enabled = True
+        self.shot_speed = speed
 
     def source_intake(self):
         self.source_intaking = True
 
+    def prespin(self):
+        """Spins the flywheels at `prespin_speed` so that a shot can be
+        fired without waiting for them to come up from rest
+        """
+        self.prespinning = True
+
+    def get_shot_output(self, speed: float | None = None) -> float:
+        """Returns the flywheel output `shoot(speed)` spins at"""
+        return self.shooter_speed if speed is None else speed
+
+    def get_prespin_output(self) -> float:
+        """Returns the flywheel output `prespin()` spins at"""
+        return min(self.prespin_speed, self.shooter_speed)
+
     def feed_in(self):
         self.feeding_in = True
 
@@ -74,34 +111,42 @@ class Shooter:
             self.feeding_in = False
 
         if self.belt_intaking:
-            self.belt_motor.set(self.belt_speed)
+            self.belt_output = self.belt_speed
         elif self.belt_ejecting:
-            self.belt_motor.set(-self.belt_speed)
+            self.belt_output = -self.belt_speed
         else:
-            self.belt_motor.set(0)
+            self.belt_output = 0
 
         if self.feeding_in:
-            self.feed_motor_group.set(self.feed_speed)
+            self.feed_output = self.feed_speed
         elif self.feeding_out:
-            self.feed_motor_group.set(-self.feed_speed * 0.3)
+            self.feed_output = -self.feed_speed * 0.3
         else:
-            self.feed_motor_group.set(0)
+            self.feed_output = 0
 
         if self.shooter_enabled:
-            self.shooter_motor_group.set(self.shooter_speed)
+            self.shooter_output = self.get_shot_output(self.shot_speed)
         elif self.source_intaking:
-            self.shooter_motor_group.set(-0.3)
+            self.shooter_output = -0.3
+        elif self.prespinning:
+            self.shooter_output = self.get_prespin_output()
         else:
-            self.shooter_motor_group.set(0)
+            self.shooter_output = 0
+
+    def flush(self):
+        """Write phase: sends the outputs computed in `execute()`"""
+        self.belt_motor.set(self.belt_output)
+        self.feed_motor_group.set(self.feed_output)
+        self.shooter_motor_group.set(self.shooter_output)
 
     @feedback
     def get_motor_speed(self):
-        return abs(self.belt_encoder.getVelocity())
+        return abs(self.belt_velocity)
 
     @feedback
     def get_has_note(self):
         return self.has_note()
-    
+
     @feedback
     def get_status_indexer_belt(self):
         return self.belt_intaking or self.belt_ejecting
@@ -1,26 +1,60 @@
-from magicbot import StateMachine, will_reset_to
+import math
+
+from magicbot import will_reset_to, tunable
 from magicbot.state_machine import state, timed_state
 
+from components.drive_control import DriveControl
 from components.intake import Intake
 from components.shooter import Shooter
+from components.vision import Vision
+from handoff import IntakeState, NoteHandoff, ShooterState
+from tracing import TracedStateMachine
+import util
 
 
-class ShooterControl(StateMachine):
+class ShooterControl(TracedStateMachine):
     """State machine that controls the shooter and shooter feed on the
     robot
     """
 
     # other components
+    drive_control: DriveControl
     intake: Intake
     shooter: Shooter
+    vision: Vision
+
+    # variables to be injected
+    handoff: NoteHandoff
+    shot_table: util.LookupTable
 
     intake_trigger = will_reset_to(False)
     eject_trigger = will_reset_to(False)
     shoot_trigger = will_reset_to(False)
-    intake_state = "transitioning"
-
-    def update_intake_state(self, state: str):
-        self.intake_state = state
+    prespin_trigger = will_reset_to(False)
+    holding_note = False
+    # time after the belt starts before its speed can be trusted
+    note_detection_delay = tunable(0.5)
+    # time spent prespinning after which the flywheels are taken to be at
+    # the prespin output, which shortens `preshooting`
+    prespin_spinup_time = tunable(0.75)
+    # used when the distance to the tag is not covered by `shot_table`
+    default_preshoot_time = tunable(0.75)
+    shot_speed = None
+    preshoot_time = 0.75
+
+    def next_state(self, state):
+        super().next_state(state)
+        self.handoff.shooter_state = ShooterState(state)
+
+    def done(self):
+        super().done()
+        self.handoff.shooter_state = ShooterState.STOPPED
+
+    def is_intake_intaking(self) -> bool:
+        """Returns `True` if `IntakeControl` is intaking this loop. The
+        intake executes first, so its state is never a loop behind.
+        """
+        return self.handoff.intake_state is IntakeState.INTAKING
 
     """Control methods
     Note that these are all prefixed with "request." This is because the
@@ -41,43 +75,127 @@ class ShooterControl(StateMachine):
     def request_shoot(self):
         self.shoot_trigger = True
 
+    def request_prespin(self):
+        self.prespin_trigger = True
+
+    def wants_prespin(self) -> bool:
+        """Returns `True` if the flywheels should be spinning ahead of a
+        shot: either a note is held in the shooter belt or the
+        drivetrain is lining up with the speaker
+        """
+        return (
+            self.holding_note
+            or self.prespin_trigger
+            or self.drive_control.current_state in ("aligning", "spacing", "settling")
+        )
+
+    def update_shot_setpoint(self):
+        """Looks up the flywheel speed and spin-up time for the measured
+        distance to the tag. Falls back on `Shooter.shooter_speed` and
+        `default_preshoot_time` if the distance is not in `shot_table`.
+        """
+        distance = self.vision.getX()
+        setpoint = None if distance is None else self.shot_table.get(distance)
+        if setpoint is None:
+            self.shot_speed = None
+            self.preshoot_time = self.default_preshoot_time
+        else:
+            self.shot_speed, self.preshoot_time = setpoint
+
+    def get_prespin_head_start(self) -> float:
+        """Returns the part of `preshoot_time` saved by having spun up to
+        the prespin output. The flywheels are taken to spin up as a
+        first-order system that settles within `preshoot_time`, three
+        time constants.
+        """
+        fraction = self.shooter.get_prespin_output() / self.shooter.get_shot_output(
+            self.shot_speed
+        )
+        if fraction >= 1:
+            return self.preshoot_time
+        if fraction <= 0:
+            return 0.0
+        return -self.preshoot_time / 3 * math.log(1 - fraction)
+
     # states
     @state(first=True)
     def idle(self):
         if self.eject_trigger:
             self.next_state("ejecting")
             return
-        if self.intake_trigger:
+        if self.intake_trigger or self.is_intake_intaking():
             self.next_state("intaking")
             return
         if self.shoot_trigger:
             self.next_state("loading")
+            return
+        if self.wants_prespin():
+            self.next_state("staging")
 
     @state
-    def intaking(self):
+    def intaking(self, state_tm):
         self.shooter.intake()
         self.shooter.feed_in()
+        if state_tm > self.note_detection_delay and self.shooter.has_note():
+            self.holding_note = True
         if self.eject_trigger:
             self.next_state("ejecting")
             return
-        if not self.intake_trigger:
+        if not (self.intake_trigger or self.is_intake_intaking()):
             self.next_state("idle")
 
     @state
     def ejecting(self):
+        self.holding_note = False
         self.shooter.eject()
         if not self.eject_trigger:
             self.next_state("idle")
 
+    @timed_state(duration=0.25, next_state="prespinning")
+    def staging(self):
+        """Backs the note away from the flywheels before they spin up"""
+        self.shooter.feed_out()
+
+    @state
+    def prespinning(self, state_tm):
+        if self.eject_trigger:
+            self.next_state("ejecting")
+            return
+        if self.intake_trigger or self.is_intake_intaking():
+            self.next_state("intaking")
+            return
+        if self.shoot_trigger:
+            self.update_shot_setpoint()
+            self.shooter.shoot(self.shot_speed)
+            # the flywheels only reach the prespin output, so preshooting
+            # is shortened by the head start that gave them rather than
+            # skipped
+            if state_tm > self.prespin_spinup_time:
+                self.preshoot_time -= self.get_prespin_head_start()
+            if self.preshoot_time <= 0:
+                self.next_state("shooting")
+            else:
+                self.next_state("preshooting")
+            return
+        if not self.wants_prespin():
+            self.next_state("idle")
+            return
+        self.shooter.prespin()
+
     @timed_state(duration=0.25, next_state="preshooting")
-    def loading(self):
+    def loading(self, initial_call):
+        if initial_call:
+            self.update_shot_setpoint()
         self.shooter.feed_out()
 
-    @timed_state(duration=0.75, next_state="shooting")
-    def preshooting(self):
-        self.shooter.shoot()
+    @state
+    def preshooting(self, state_tm):
+        self.shooter.shoot(self.shot_speed)
+        if state_tm > self.preshoot_time:
+            self.next_state("shooting")
 
     @timed_state(duration=1.0, next_state="idle")
     def shooting(self):
+        self.holding_note = False
         self.shooter.feed_in()
-        self.shooter.shoot()
+        self.shooter.shoot(self.shot_speed)
@@ -47,10 +47,13 @@ class SmartCamera(PhotonCamera):
         self.latency = 0
         self.drought = self.filter_window
         self.sought_ids = sought_ids
+        # latest result, kept for logging
+        self.result = None
 
     def update(self) -> None:
         """Call this every loop"""
         result = self.getLatestResult()
+        self.result = result
         if result.hasTargets():
             self.drought = 0
             potential_targets = list(
@@ -157,11 +160,21 @@ class Vision:
     def setSoughtIds(self, sought_ids):
         self.sought_ids = sought_ids
 
-    def execute(self):
+    def getCameraOffset(self) -> float:
+        """Returns how far forward of the center of the robot the cameras
+        are mounted, on average (m)
+        """
+        return float(np.mean([cam.rc[0] for cam in self.cameras]))
+
+    def read(self):
+        """Read phase: polls both cameras"""
         for cam in self.cameras:
             cam.setSoughtIds(self.sought_ids)
             cam.update()
 
+    def execute(self):
+        pass
+
     # @feedback
     # def get_left_id(self) -> int:
     #     id = self.left_camera.getId()
@@ -0,0 +1,381 @@
+"""Records matches to WPILib DataLog (`.wpilog`) files, which AdvantageScope
+and WPILib's DataLogTool can read.
+
+Records are packed into a preallocated ring buffer on the robot loop and
+written to disk in large sequential chunks by a background thread, so
+logging only costs the loop a few `struct.pack_into()` calls. If the
+disk falls so far behind that the buffer fills, records are dropped and
+counted rather than blocking the loop.
+
+`MatchLog` records, every loop, what each component read from its
+sensors, what it sent to its motor controllers, the state of each
+control state machine (on change) and the raw camera results.
+"""
+
+import math
+import os
+import struct
+import threading
+import time
+import typing
+
+import wpilib
+
+MAGIC = b"WPILOG"
+VERSION = 0x0100
+FILE_HEADER = struct.Struct("<6sHI")
+# every record uses 4-byte entry ids and payload sizes and 8-byte
+# timestamps, which the header byte 0x7F says
+RECORD_HEADER = struct.Struct("<BIIQ")
+RECORD_HEADER_BYTE = 0x7F
+CONTROL_START = 0
+DOUBLE = struct.Struct("<d")
+INT64 = struct.Struct("<q")
+
+
+def new_log_path() -> str:
+    directory = os.path.join(wpilib.getOperatingDirectory(), "logs")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"perry-{time.strftime('%Y%m%d-%H%M%S')}.wpilog")
+
+
+class DataLogWriter:
+    """Writes a DataLog file from a ring buffer of `buffer_size` bytes,
+    flushed by a background thread once `chunk_size` bytes are pending or
+    every `flush_period` seconds
+    """
+
+    def __init__(
+        self,
+        path: str,
+        buffer_size: int = 1 << 20,
+        chunk_size: int = 1 << 16,
+        flush_period: float = 1.0,
+        max_record_size: int = 1 << 12,
+    ):
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.size = buffer_size
+        self.chunk_size = chunk_size
+        self.flush_period = flush_period
+        # records are packed here before being copied into the ring
+        self.scratch = bytearray(max_record_size)
+        # total bytes ever written and flushed, so that `written - flushed`
+        # is the number of bytes pending
+        self.written = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.next_entry = 1
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopping = False
+
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(FILE_HEADER.pack(MAGIC, VERSION, 0))
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def start(self, name: str, type: str, metadata: str = "") -> int:
+        """Starts an entry and returns its id"""
+        entry = self.next_entry
+        self.next_entry += 1
+        payload = bytearray(struct.pack("<BI", CONTROL_START, entry))
+        for string in (name, type, metadata):
+            encoded = string.encode()
+            payload += struct.pack("<I", len(encoded)) + encoded
+        self._append(0, bytes(payload), self._now())
+        return entry
+
+    def append_double(self, entry: int, value: float, timestamp: int) -> None:
+        DOUBLE.pack_into(self.scratch, RECORD_HEADER.size, value)
+        self._commit(entry, DOUBLE.size, timestamp)
+
+    def append_integer(self, entry: int, value: int, timestamp: int) -> None:
+        INT64.pack_into(self.scratch, RECORD_HEADER.size, value)
+        self._commit(entry, INT64.size, timestamp)
+
+    def append_boolean(self, entry: int, value: bool, timestamp: int) -> None:
+        self.scratch[RECORD_HEADER.size] = 1 if value else 0
+        self._commit(entry, 1, timestamp)
+
+    def append_string(self, entry: int, value: str, timestamp: int) -> None:
+        self._append(entry, value.encode(), timestamp)
+
+    def append_double_array(
+        self, entry: int, values: list[float], timestamp: int
+    ) -> None:
+        self._append(entry, struct.pack(f"<{len(values)}d", *values), timestamp)
+
+    def _now(self) -> int:
+        return int(wpilib.Timer.getFPGATimestamp() * 1e6)
+
+    def _append(self, entry: int, payload: bytes, timestamp: int) -> None:
+        if RECORD_HEADER.size + len(payload) > len(self.scratch):
+            self.dropped += 1
+            return
+        start = RECORD_HEADER.size
+        self.scratch[start : start + len(payload)] = payload
+        self._commit(entry, len(payload), timestamp)
+
+    def _commit(self, entry: int, payload_size: int, timestamp: int) -> None:
+        """Copies the record packed in `scratch` into the ring"""
+        RECORD_HEADER.pack_into(
+            self.scratch, 0, RECORD_HEADER_BYTE, entry, payload_size, timestamp
+        )
+        length = RECORD_HEADER.size + payload_size
+        with self.lock:
+            if self.written - self.flushed + length > self.size:
+                self.dropped += 1
+                return
+            start = self.written % self.size
+            first = min(length, self.size - start)
+            self.buffer[start : start + first] = self.scratch[:first]
+            if first < length:
+                self.buffer[: length - first] = self.scratch[first:length]
+            self.written += length
+            pending = self.written - self.flushed
+        if pending >= self.chunk_size:
+            self.wake.set()
+
+    def _run(self) -> None:
+        while not self.stopping:
+            self.wake.wait(self.flush_period)
+            self.wake.clear()
+            self._flush()
+        self._flush()
+        self.file.close()
+
+    def _flush(self) -> None:
+        # the loop only appends past `written`, so the pending bytes can
+        # be written without holding the lock
+        with self.lock:
+            written = self.written
+        start = self.flushed % self.size
+        end = start + written - self.flushed
+        if end > self.size:
+            self.file.write(self.view[start:])
+            self.file.write(self.view[: end - self.size])
+        else:
+            self.file.write(self.view[start:end])
+        self.file.flush()
+        with self.lock:
+            self.flushed = written
+
+    def close(self) -> None:
+        """Flushes everything pending and closes the file"""
+        self.stopping = True
+        self.wake.set()
+        self.thread.join()
+
+
+def _optional(value: float | None) -> float:
+    return math.nan if value is None else value
+
+
+# operator inputs read by `MyRobot.teleopPeriodic()`
+OI_METHODS = [
+    "drive_forward",
+    "drive_turn",
+    "contract_left_climber",
+    "contract_right_climber",
+    "extend_left_climber",
+    "extend_right_climber",
+    "contract_climbers",
+    "extend_climbers",
+    "align",
+    "cancel_align",
+    "override_intake_disable",
+    "source_intake",
+    "soft_shoot",
+    "hard_shoot",
+    "intake",
+    "eject",
+    "intake_down",
+]
+STATE_MACHINES = ["drive_control", "intake_control", "shooter_control"]
+
+
+def get_mode() -> str:
+    if wpilib.DriverStation.isDisabled():
+        return "disabled"
+    if wpilib.DriverStation.isAutonomous():
+        return "autonomous"
+    if wpilib.DriverStation.isTest():
+        return "test"
+    return "teleop"
+
+
+def sensor_signals(robot) -> list[tuple[str, typing.Callable[[], float]]]:
+    """What the components read from their sensors"""
+    drivetrain = robot.drivetrain
+    intake = robot.intake
+    shooter = robot.shooter
+    climber = robot.climber
+    return [
+        ("drivetrain/left_position", lambda: drivetrain.left_position),
+        ("drivetrain/right_position", lambda: drivetrain.right_position),
+        ("drivetrain/left_velocity", lambda: drivetrain.left_velocity),
+        ("drivetrain/right_velocity", lambda: drivetrain.right_velocity),
+        ("gyro/angle", drivetrain.get_angle),
+        ("intake/position", lambda: _optional(intake.position)),
+        ("intake/belt_velocity", lambda: intake.belt_velocity),
+        ("shooter/belt_velocity", lambda: shooter.belt_velocity),
+        ("climber/left_position", lambda: climber.left_position),
+        ("climber/right_position", lambda: climber.right_position),
+        ("climber/left_limit", lambda: float(climber.left_limit_pressed)),
+        ("climber/right_limit", lambda: float(climber.right_limit_pressed)),
+    ]
+
+
+def command_signals(robot) -> list[tuple[str, typing.Callable[[], float]]]:
+    """What the components sent to their motor controllers"""
+    drivetrain = robot.drivetrain
+    intake = robot.intake
+    shooter = robot.shooter
+    climber = robot.climber
+    return [
+        ("drivetrain/forward", lambda: drivetrain.forward),
+        ("drivetrain/turn", lambda: drivetrain.turn),
+        ("drivetrain/left_voltage", lambda: _optional(drivetrain.left_voltage)),
+        ("drivetrain/right_voltage", lambda: _optional(drivetrain.right_voltage)),
+        ("intake/joint_output", lambda: _optional(intake.joint_output)),
+        ("intake/belt_output", lambda: intake.belt_output),
+        ("shooter/belt_output", lambda: shooter.belt_output),
+        ("shooter/feed_output", lambda: shooter.feed_output),
+        ("shooter/shooter_output", lambda: shooter.shooter_output),
+        ("climber/left_output", lambda: climber.left_output),
+        ("climber/right_output", lambda: climber.right_output),
+    ]
+
+
+def oi_signals(robot) -> list[tuple[str, typing.Callable[[], float]]]:
+    return [
+        (f"oi/{name}", lambda method=getattr(robot.oi, name): float(method()))
+        for name in OI_METHODS
+    ]
+
+
+class MatchLog:
+    """Logs the signals of `robot` to `writer` each time `log()` is
+    called. Numeric signals are logged every call, the mode and states
+    only when they change.
+    """
+
+    def __init__(self, writer: DataLogWriter, robot):
+        self.writer = writer
+        self.doubles = (
+            sensor_signals(robot) + command_signals(robot) + oi_signals(robot)
+        )
+        self.double_entries = [writer.start(name, "double") for name, _ in self.doubles]
+        self.mode_entry = writer.start("robot/mode", "string")
+        self.mode = None
+        self.state_machines = [getattr(robot, name) for name in STATE_MACHINES]
+        self.state_entries = [
+            writer.start(f"{name}/state", "string") for name in STATE_MACHINES
+        ]
+        self.states = [None] * len(self.state_machines)
+        self.cameras = robot.vision.cameras
+        # each target is logged as [id, x, y, z, ambiguity], after the
+        # result's latency (ms)
+        self.camera_entries = [
+            writer.start(f"vision/{camera.getName()}/result", "double[]")
+            for camera in self.cameras
+        ]
+        self.camera_timestamps = [None] * len(self.cameras)
+
+    def log(self) -> None:
+        writer = self.writer
+        timestamp = int(wpilib.Timer.getFPGATimestamp() * 1e6)
+        for entry, (_, get) in zip(self.double_entries, self.doubles):
+            writer.append_double(entry, get(), timestamp)
+        mode = get_mode()
+        if mode != self.mode:
+            self.mode = mode
+            writer.append_string(self.mode_entry, mode, timestamp)
+        for i, state_machine in enumerate(self.state_machines):
+            state = state_machine.current_state
+            if state != self.states[i]:
+                self.states[i] = state
+                writer.append_string(self.state_entries[i], state, timestamp)
+        for i, camera in enumerate(self.cameras):
+            result = camera.result
+            # results are only logged when the camera gets a new one
+            if result is None or result.getTimestamp() == self.camera_timestamps[i]:
+                continue
+            self.camera_timestamps[i] = result.getTimestamp()
+            values = [result.getLatencyMillis()]
+            for target in result.getTargets():
+                transform = target.getBestCameraToTarget()
+                values += [
+                    target.getFiducialId(),
+                    transform.X(),
+                    transform.Y(),
+                    transform.Z(),
+                    target.getPoseAmbiguity(),
+                ]
+            writer.append_double_array(self.camera_entries[i], values, timestamp)
+
+
+def decode(type: str, payload: bytes):
+    """Decodes the payload of a record of an entry of `type`"""
+    if type == "double":
+        return DOUBLE.unpack(payload)[0]
+    if type == "int64":
+        return INT64.unpack(payload)[0]
+    if type == "float":
+        return struct.unpack("<f", payload)[0]
+    if type == "boolean":
+        return payload[0] != 0
+    if type == "string":
+        return payload.decode()
+    if type == "double[]":
+        return list(struct.unpack(f"<{len(payload) // 8}d", payload))
+    if type == "int64[]":
+        return list(struct.unpack(f"<{len(payload) // 8}q", payload))
+    return bytes(payload)
+
+
+def read_log(path: str) -> dict[str, tuple[list[int], list]]:
+    """Reads a DataLog file record by record. Returns, for each entry
+    name, the timestamps (us) and values of its records.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, extra = FILE_HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a DataLog file")
+    pos = FILE_HEADER.size + extra
+    entries = {}
+    signals = {}
+    while pos < len(data):
+        header = data[pos]
+        id_length = (header & 0x3) + 1
+        size_length = ((header >> 2) & 0x3) + 1
+        time_length = ((header >> 4) & 0x7) + 1
+        pos += 1
+        entry = int.from_bytes(data[pos : pos + id_length], "little")
+        pos += id_length
+        size = int.from_bytes(data[pos : pos + size_length], "little")
+        pos += size_length
+        timestamp = int.from_bytes(data[pos : pos + time_length], "little")
+        pos += time_length
+        payload = data[pos : pos + size]
+        pos += size
+        if entry == 0:
+            if payload[0] == CONTROL_START:
+                started, length = struct.unpack_from("<II", payload, 1)
+                name = payload[9 : 9 + length].decode()
+                (type_length,) = struct.unpack_from("<I", payload, 9 + length)
+                start = 13 + length
+                type = payload[start : start + type_length].decode()
+                entries[started] = (name, type)
+                signals.setdefault(name, ([], []))
+            continue
+        if entry not in entries:
+            continue
+        name, type = entries[entry]
+        timestamps, values = signals[name]
+        timestamps.append(timestamp)
+        values.append(decode(type, payload))
+    return signals
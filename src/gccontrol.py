@@ -0,0 +1,169 @@
+"""Keeps Python's garbage collector from pausing the control loop.
+
+Everything allocated while the robot starts up lives for the whole
+match, so `freeze()` moves it out of the collector's sight once the
+robot is set up. While the robot is enabled, automatic collection is
+off, and `tick()` collects the young generations only when the loop has
+time to spare. Only when the young objects pile up far past the
+automatic threshold is a collection forced into a busy loop. The full
+collection waits until the robot is disabled.
+
+Every collection is timed through `gc.callbacks`, and the growth of the
+objects the collector tracks is counted each tick. This growth is what
+makes collections run: objects freed as soon as they are no longer
+referenced do not count towards it. `publish()` sends the pause times
+and growth to NetworkTables under `/gc`.
+
+To find the code behind the growth, turn on the `trace_allocations`
+tunable. Then each `sample()` takes a tracemalloc snapshot and publishes
+the source lines whose memory grew the most since the last one to
+`/gc/top_allocators`. Tracing slows every allocation and taking a
+snapshot takes several milliseconds, so leave it off in matches.
+"""
+
+import gc
+import time
+import tracemalloc
+
+import numpy as np
+from ntcore import NetworkTableInstance
+
+# a young collection is left for a later loop with less slack than this
+# (s)
+COLLECT_SLACK = 0.004
+# multiple of the automatic threshold at which a young collection runs
+# regardless of slack
+FORCE_FACTOR = 20
+TOP_ALLOCATORS = 10
+
+
+class GCControl:
+    def __init__(self, size: int = 1024):
+        self.size = size
+        # pause (s) and generation of each collection
+        self.pauses = np.zeros(size)
+        self.generations = np.zeros(size, dtype=np.int8)
+        self.pause_head = 0
+        self.pause_count = 0
+        self.collections = [0, 0, 0]
+        # growth of the tracked objects in each tick
+        self.growth = np.zeros(size, dtype=np.int64)
+        self.growth_head = 0
+        self.growth_count = 0
+        self.last_count = 0
+        # ticks since the last snapshot
+        self.sample_ticks = 0
+        self.collect_start = None
+        self.snapshot = None
+
+        table = NetworkTableInstance.getDefault().getTable("gc")
+        # [p50, p99, max] (s)
+        self.pause_pub = table.getDoubleArrayTopic("pauses").publish()
+        self.collections_pub = table.getIntegerArrayTopic("collections").publish()
+        # [mean, p99, max] (objects/tick)
+        self.growth_pub = table.getDoubleArrayTopic("growth").publish()
+        self.allocators_pub = table.getStringArrayTopic("top_allocators").publish()
+        gc.callbacks.append(self.on_collect)
+
+    def on_collect(self, phase: str, info: dict) -> None:
+        if phase == "start":
+            self.collect_start = time.perf_counter()
+            return
+        if self.collect_start is None:
+            return
+        i = self.pause_head
+        self.pauses[i] = time.perf_counter() - self.collect_start
+        self.generations[i] = info["generation"]
+        self.pause_head = (i + 1) % self.size
+        self.pause_count = min(self.pause_count + 1, self.size)
+        self.collections[info["generation"]] += 1
+        self.collect_start = None
+
+    def freeze(self) -> None:
+        """Collects, then moves every object that survives to the
+        permanent generation, which is never collected
+        """
+        gc.collect()
+        gc.freeze()
+        self.last_count = gc.get_count()[0]
+
+    def on_enable(self) -> None:
+        gc.disable()
+        self.last_count = gc.get_count()[0]
+
+    def on_disable(self) -> None:
+        """Runs the full collection put off while enabled and turns
+        automatic collection back on
+        """
+        gc.collect()
+        gc.enable()
+        self.last_count = gc.get_count()[0]
+        self.publish()
+
+    def tick(self, slack: float, trace: bool = False) -> None:
+        """Call at the end of each loop with the time left before the
+        next one (s)
+        """
+        count = gc.get_count()
+        i = self.growth_head
+        self.growth[i] = count[0] - self.last_count
+        self.growth_head = (i + 1) % self.size
+        self.growth_count = min(self.growth_count + 1, self.size)
+        self.sample_ticks += 1
+
+        if not gc.isenabled():
+            threshold = gc.get_threshold()
+            if count[0] >= threshold[0] * FORCE_FACTOR or (
+                count[0] >= threshold[0] and slack >= COLLECT_SLACK
+            ):
+                # the middle generation too, once enough young
+                # collections have moved objects into it
+                gc.collect(1 if count[1] >= threshold[1] else 0)
+        self.last_count = gc.get_count()[0]
+
+        if trace != tracemalloc.is_tracing():
+            if trace:
+                tracemalloc.start()
+            else:
+                tracemalloc.stop()
+                self.snapshot = None
+
+    def sample(self) -> None:
+        """Publishes where the traced memory grew since the last call,
+        if allocations are being traced
+        """
+        if not tracemalloc.is_tracing():
+            return
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        )
+        if self.snapshot is not None and self.sample_ticks > 0:
+            ticks = self.sample_ticks
+            stats = snapshot.compare_to(self.snapshot, "lineno")
+            self.allocators_pub.set(
+                [
+                    f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} "
+                    f"{stat.size_diff / ticks:+.0f} B/tick "
+                    f"{stat.count_diff / ticks:+.1f} blocks/tick"
+                    for stat in stats[:TOP_ALLOCATORS]
+                ]
+            )
+        self.snapshot = snapshot
+        self.sample_ticks = 0
+
+    def get_pauses(self) -> np.ndarray:
+        return self.pauses[: self.pause_count]
+
+    def get_growth(self) -> np.ndarray:
+        return self.growth[: self.growth_count]
+
+    def publish(self) -> None:
+        if self.pause_count:
+            pauses = self.get_pauses()
+            self.pause_pub.set(list(np.percentile(pauses, [50, 99])) + [pauses.max()])
+        if self.growth_count:
+            growth = self.get_growth()
+            self.growth_pub.set(
+                [growth.mean(), np.percentile(growth, 99), growth.max()]
+            )
+        self.collections_pub.set(self.collections)
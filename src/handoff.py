@@ -0,0 +1,40 @@
+from enum import Enum
+
+
+class IntakeState(Enum):
+    """States of `IntakeControl`. `STOPPED` means it is not executing"""
+
+    STOPPED = ""
+    TRANSITIONING = "transitioning"
+    IDLE = "idle"
+    READY = "ready"
+    INTAKING = "intaking"
+    EJECTING = "ejecting"
+    DISABLED = "disabled"
+
+
+class ShooterState(Enum):
+    """States of `ShooterControl`. `STOPPED` means it is not executing"""
+
+    STOPPED = ""
+    IDLE = "idle"
+    INTAKING = "intaking"
+    EJECTING = "ejecting"
+    STAGING = "staging"
+    PRESPINNING = "prespinning"
+    LOADING = "loading"
+    PRESHOOTING = "preshooting"
+    SHOOTING = "shooting"
+
+
+class NoteHandoff:
+    """Blackboard shared by `IntakeControl` and `ShooterControl`. Each
+    state machine writes its state here the moment it transitions, so
+    a state machine that executes later in the same loop (components
+    execute in the order they are declared in `MyRobot`) acts on the
+    other's current state rather than on last loop's.
+    """
+
+    def __init__(self):
+        self.intake_state = IntakeState.STOPPED
+        self.shooter_state = ShooterState.STOPPED
@@ -0,0 +1,131 @@
+"""Measures the latency from an operator input to the motor command it
+causes, for each input path:
+
+drive -- a stick leaving the deadband, to the drivetrain driving from
+    the sticks
+shoot -- a shoot button press, to the shooter control starting the shot
+    (loading, preshooting or shooting)
+intake -- an intake button press, to the intake control running the
+    intake belt inwards
+
+An input is timed from its OI snapshot and an output from the end of the
+write phase, when the command has been sent to the motor controller.
+Latencies are kept in a preallocated ring buffer, and `publish()` sends
+their distribution to NetworkTables under `/latency/<path>`.
+"""
+
+import numpy as np
+from ntcore import NetworkTableInstance
+import wpilib
+
+# stick deflection taken as the driver moving it
+DRIVE_THRESHOLD = 0.1
+# shooter control states that a shoot request leads to
+SHOT_STATES = ("loading", "preshooting", "shooting")
+# an input with no output within this time (s) caused none, as when a
+# soft shot is refused
+TIMEOUT = 2.0
+
+
+class LatencyProbe:
+    """Times each input that becomes active to the first output that
+    becomes active after it. Inputs while one is pending are ignored,
+    and inputs with no output within `TIMEOUT` are dropped, as are
+    inputs made while the output is already active.
+    """
+
+    def __init__(self, name: str, size: int = 256):
+        self.latencies = np.zeros(size)
+        self.size = size
+        self.head = 0
+        self.count = 0
+        self.input_active = False
+        self.output_active = False
+        self.pending = None
+
+        table = NetworkTableInstance.getDefault().getTable("latency").getSubTable(name)
+        self.count_pub = table.getIntegerTopic("count").publish()
+        # [p50, p90, p99, max] (s)
+        self.stats_pub = table.getDoubleArrayTopic("stats").publish()
+
+    def input(self, active: bool, timestamp: float) -> None:
+        if active and not self.input_active and self.pending is None:
+            self.pending = timestamp
+        self.input_active = active
+
+    def output(self, active: bool, timestamp: float) -> None:
+        rising = active and not self.output_active
+        self.output_active = active
+        if self.pending is None:
+            return
+        if timestamp - self.pending > TIMEOUT:
+            self.pending = None
+            return
+        if not rising:
+            return
+        self.latencies[self.head] = timestamp - self.pending
+        self.head = (self.head + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        self.pending = None
+
+    def get_latencies(self) -> np.ndarray:
+        return (
+            self.latencies[: self.count] if self.count < self.size else self.latencies
+        )
+
+    def get_stats(self) -> list[float]:
+        """Returns the 50th, 90th and 99th percentiles and the maximum of
+        the buffered latencies (s)
+        """
+        if self.count == 0:
+            return [0.0, 0.0, 0.0, 0.0]
+        latencies = self.get_latencies()
+        return list(np.percentile(latencies, [50, 90, 99])) + [latencies.max()]
+
+    def publish(self) -> None:
+        self.count_pub.set(self.count)
+        self.stats_pub.set(self.get_stats())
+
+
+class LatencyMonitor:
+    """Probes for each input path of `robot`"""
+
+    def __init__(self, robot):
+        self.robot = robot
+        self.drive = LatencyProbe("drive")
+        self.shoot = LatencyProbe("shoot")
+        self.intake = LatencyProbe("intake")
+
+    def record_inputs(self) -> None:
+        """Call after the OI snapshot is taken"""
+        oi = self.robot.oi
+        timestamp = oi.timestamp
+        self.drive.input(
+            abs(oi.drive_forward()) > DRIVE_THRESHOLD
+            or abs(oi.drive_turn()) > DRIVE_THRESHOLD,
+            timestamp,
+        )
+        self.shoot.input(oi.hard_shoot() or oi.soft_shoot(), timestamp)
+        self.intake.input(oi.intake(), timestamp)
+
+    def record_outputs(self) -> None:
+        """Call after the write phase"""
+        robot = self.robot
+        timestamp = wpilib.Timer.getFPGATimestamp()
+        drivetrain = robot.drivetrain
+        # the drive control only passes the sticks through while free
+        self.drive.output(
+            robot.drive_control.current_state == "free"
+            and (drivetrain.forward != 0 or drivetrain.turn != 0),
+            timestamp,
+        )
+        self.shoot.output(robot.shooter_control.current_state in SHOT_STATES, timestamp)
+        self.intake.output(
+            robot.intake_control.current_state == "intaking"
+            and robot.intake.belt_intaking,
+            timestamp,
+        )
+
+    def publish(self) -> None:
+        for probe in (self.drive, self.shoot, self.intake):
+            probe.publish()
@@ -0,0 +1,236 @@
+"""Reads DataLog files recorded by the robot for post-match analysis,
+without parsing records one by one on every query:
+
+    python loganalysis.py export LOG ...   -- writes LOG.npz beside each log
+    python loganalysis.py summary LOG ...  -- loop time statistics
+
+`MappedLog` memory-maps a log and scans the record headers once,
+building an index of the records of each signal. A numeric signal is
+then pulled out as a NumPy array straight from the mapped file: a view
+with no copy when its records are evenly spaced in the file, and a
+single vectorized gather otherwise. The index is built with one pass
+over the headers, which for the writer's fixed-width headers is one
+`struct.unpack_from()` per record.
+
+In the `.npz` export, each signal `name` is stored as `name.time` (us)
+and `name.value`. Array signals are stored flattened, with
+`name.length` giving the length of each record.
+"""
+
+import argparse
+import mmap
+import struct
+import sys
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+import datalog
+
+# NumPy types of the entry types with fixed-size payloads
+DTYPES = {
+    "double": np.dtype("<f8"),
+    "float": np.dtype("<f4"),
+    "int64": np.dtype("<i8"),
+    "boolean": np.dtype("?"),
+}
+ARRAY_DTYPES = {
+    "double[]": np.dtype("<f8"),
+    "float[]": np.dtype("<f4"),
+    "int64[]": np.dtype("<i8"),
+    "boolean[]": np.dtype("?"),
+}
+
+
+class MappedLog:
+    """A memory-mapped log. The arrays returned by `get()` may be views
+    of the mapped file, which keep it mapped: `close()` raises
+    `BufferError` while any of them is still referenced.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.types = {}
+        # offset of the payload, payload size and timestamp of each record
+        # of each signal
+        self.index = {}
+        self._build_index()
+
+    def close(self) -> None:
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _build_index(self) -> None:
+        data = self.map
+        magic, _, extra = datalog.FILE_HEADER.unpack_from(data)
+        if magic != datalog.MAGIC:
+            raise ValueError(f"{self.path} is not a DataLog file")
+        names = {}
+        offsets = {}
+        sizes = {}
+        timestamps = {}
+        pos = datalog.FILE_HEADER.size + extra
+        end = len(data)
+        fixed = datalog.RECORD_HEADER
+        while pos < end:
+            header = data[pos]
+            # the writer's fixed-width headers are unpacked in one call
+            if header == datalog.RECORD_HEADER_BYTE:
+                _, entry, size, timestamp = fixed.unpack_from(data, pos)
+                pos += fixed.size
+            else:
+                id_length = (header & 0x3) + 1
+                size_length = ((header >> 2) & 0x3) + 1
+                time_length = ((header >> 4) & 0x7) + 1
+                pos += 1
+                entry = int.from_bytes(data[pos : pos + id_length], "little")
+                pos += id_length
+                size = int.from_bytes(data[pos : pos + size_length], "little")
+                pos += size_length
+                timestamp = int.from_bytes(data[pos : pos + time_length], "little")
+                pos += time_length
+            if entry == 0:
+                if data[pos] == datalog.CONTROL_START:
+                    name = self._start(data, pos, names)
+                    offsets.setdefault(name, [])
+                    sizes.setdefault(name, [])
+                    timestamps.setdefault(name, [])
+            elif entry in names:
+                name = names[entry]
+                offsets[name].append(pos)
+                sizes[name].append(size)
+                timestamps[name].append(timestamp)
+            pos += size
+        for name in offsets:
+            self.index[name] = (
+                np.array(offsets[name], dtype=np.int64),
+                np.array(sizes[name], dtype=np.int64),
+                np.array(timestamps[name], dtype=np.int64),
+            )
+
+    def _start(self, data, pos: int, names: dict) -> str:
+        """Reads a start control record, returning the entry's name"""
+        entry, length = struct.unpack_from("<II", data, pos + 1)
+        start = pos + 9
+        name = bytes(data[start : start + length]).decode()
+        (type_length,) = struct.unpack_from("<I", data, start + length)
+        start += length + 4
+        self.types[name] = bytes(data[start : start + type_length]).decode()
+        names[entry] = name
+        return name
+
+    def names(self) -> list[str]:
+        return list(self.index)
+
+    def timestamps(self, name: str) -> np.ndarray:
+        """Timestamps (us) of the records of `name`"""
+        return self.index[name][2]
+
+    def get(self, name: str) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the timestamps (us) and values of a numeric signal.
+        The values are a read-only view of the mapped file when the
+        records are evenly spaced.
+        """
+        dtype = DTYPES[self.types[name]]
+        offsets, _, timestamps = self.index[name]
+        if len(offsets) == 0:
+            return timestamps, np.empty(0, dtype)
+        strides = np.diff(offsets)
+        if len(offsets) == 1 or (strides == strides[0]).all():
+            stride = int(strides[0]) if len(strides) else dtype.itemsize
+            # frombuffer() holds the map's buffer, so that it cannot be
+            # unmapped under the view
+            first = np.frombuffer(self.map, dtype, count=1, offset=int(offsets[0]))
+            values = as_strided(
+                first, shape=(len(offsets),), strides=(stride,), writeable=False
+            )
+            return timestamps, values
+        whole = np.frombuffer(self.map, np.uint8)
+        gathered = whole[offsets[:, None] + np.arange(dtype.itemsize)]
+        return timestamps, gathered.view(dtype).reshape(-1)
+
+    def get_arrays(self, name: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the timestamps (us), flattened values and record
+        lengths of an array signal
+        """
+        dtype = ARRAY_DTYPES[self.types[name]]
+        offsets, sizes, timestamps = self.index[name]
+        lengths = sizes // dtype.itemsize
+        whole = np.frombuffer(self.map, np.uint8)
+        if len(offsets):
+            byte_indices = np.concatenate(
+                [np.arange(o, o + s) for o, s in zip(offsets, sizes)]
+            )
+        else:
+            byte_indices = np.empty(0, np.int64)
+        return timestamps, whole[byte_indices].view(dtype), lengths
+
+    def get_strings(self, name: str) -> tuple[np.ndarray, list[str]]:
+        offsets, sizes, timestamps = self.index[name]
+        return timestamps, [
+            bytes(self.map[o : o + s]).decode() for o, s in zip(offsets, sizes)
+        ]
+
+    def export(self, path: str) -> None:
+        """Writes every signal to a columnar `.npz` file"""
+        columns = {}
+        for name, type in self.types.items():
+            if name not in self.index:
+                continue
+            key = name.replace("/", ".")
+            if type in DTYPES:
+                columns[f"{key}.time"], columns[f"{key}.value"] = self.get(name)
+            elif type in ARRAY_DTYPES:
+                (
+                    columns[f"{key}.time"],
+                    columns[f"{key}.value"],
+                    columns[f"{key}.length"],
+                ) = self.get_arrays(name)
+            elif type == "string":
+                timestamps, values = self.get_strings(name)
+                columns[f"{key}.time"] = timestamps
+                columns[f"{key}.value"] = np.array(values, dtype=str)
+        np.savez(path, **columns)
+
+
+def loop_times(log: MappedLog) -> np.ndarray:
+    """Returns the time between loops (s), from a signal logged every
+    loop
+    """
+    return np.diff(log.timestamps("drivetrain/left_position")) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["export", "summary"])
+    parser.add_argument("logs", nargs="+")
+    args = parser.parse_args()
+
+    for path in args.logs:
+        with MappedLog(path) as log:
+            if args.command == "export":
+                output = path.rsplit(".", 1)[0] + ".npz"
+                log.export(output)
+                print(f"{path} -> {output}")
+            else:
+                times = loop_times(log) * 1000
+                if len(times) == 0:
+                    print(f"{path}: no loops", file=sys.stderr)
+                    continue
+                print(
+                    f"{path}: {len(times) + 1} loops, loop time (ms) "
+                    f"mean {times.mean():.2f}, p50 {np.percentile(times, 50):.2f}, "
+                    f"p99 {np.percentile(times, 99):.2f}, max {times.max():.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
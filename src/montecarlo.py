@@ -0,0 +1,241 @@
+"""Runs each autonomous mode many times in the simulator with randomized
+noise, and reports the distribution of completion times and how often
+each mode finishes:
+
+    python montecarlo.py [--runs N] [--seed S] [--jobs N] [--json FILE] [MODE ...]
+
+Each run samples, from `RANGES`:
+    start_x, start_y, start_heading -- error in the starting pose
+        (m, m, degrees)
+    dropout_rate -- chance each loop that the cameras start losing tags
+    dropout_length -- mean number of loops a dropout lasts
+    latency -- extra loops of camera latency
+    gyro_drift -- (degrees/s)
+    motor_gain -- scales the drivetrain outputs
+
+Runs that do not finish are grouped by the state the mode was stuck in,
+which shows how often a mode hangs (for example in `finding_tag` when
+tags flicker). As in `autosim`, each run gets a new worker process,
+since the HAL supports only one robot per process and a robot left from
+an earlier run would carry its state into the next.
+"""
+
+import argparse
+import collections
+import dataclasses
+import functools
+import json
+import multiprocessing
+import os
+import random
+
+import numpy as np
+
+import autosim
+
+RANGES = {
+    "start_x": (-0.15, 0.15),
+    "start_y": (-0.15, 0.15),
+    "start_heading": (-5.0, 5.0),
+    "dropout_rate": (0.0, 0.1),
+    "dropout_length": (1.0, 15.0),
+    "latency": (0, 3),
+    "gyro_drift": (-0.1, 0.1),
+    "motor_gain": (0.85, 1.05),
+}
+
+
+def sample_noise(rng: random.Random) -> dict:
+    noise = {
+        name: rng.uniform(low, high)
+        for name, (low, high) in RANGES.items()
+        if name != "latency"
+    }
+    noise["latency"] = rng.randint(*RANGES["latency"])
+    noise["seed"] = rng.getrandbits(32)
+    return noise
+
+
+class CameraNoise:
+    """Replaces `getLatestResult()` of a camera with one that delays
+    results and drops them in bursts
+    """
+
+    def __init__(self, camera, rng: random.Random, noise: dict):
+        from photonlibpy.photonPipelineResult import PhotonPipelineResult
+
+        self.empty = PhotonPipelineResult
+        self.get_latest_result = camera.getLatestResult
+        self.rng = rng
+        self.dropout_rate = noise["dropout_rate"]
+        self.dropout_end_chance = 1 / noise["dropout_length"]
+        self.latency = noise["latency"]
+        self.results = collections.deque()
+        self.dropping = False
+        # the camera's last result and its delayed copy. The camera may
+        # return the same result for many loops, so it is copied once,
+        # rather than changed, and the copy keeps its identity too.
+        self.last_result = None
+        self.delayed = None
+
+    def __call__(self):
+        result = self.get_latest_result()
+        if result is not self.last_result:
+            self.last_result = result
+            self.delayed = dataclasses.replace(
+                result, latencyMillis=result.latencyMillis + self.latency * 20
+            )
+        self.results.append(self.delayed)
+        if len(self.results) <= self.latency:
+            return self.empty()
+        result = self.results.popleft()
+        if self.dropping:
+            self.dropping = self.rng.random() > self.dropout_end_chance
+        else:
+            self.dropping = self.rng.random() < self.dropout_rate
+        if self.dropping:
+            return self.empty()
+        return result
+
+
+class GyroDrift:
+    """Adds drift to the simulated navX's yaw after every loop. Yaw set
+    by the physics engine since the last loop is taken as the true yaw.
+    """
+
+    def __init__(self, rate: float):
+        import wpilib
+        from wpilib.simulation import SimDeviceSim
+
+        self.timer = wpilib.Timer
+        self.yaw = SimDeviceSim("navX-Sensor[4]").getDouble("Yaw")
+        self.rate = rate
+        self.drift = 0.0
+        self.truth = self.yaw.get()
+        self.written = self.truth
+        self.last_time = self.timer.getFPGATimestamp()
+
+    def __call__(self):
+        now = self.timer.getFPGATimestamp()
+        current = self.yaw.get()
+        if current != self.written:
+            self.truth = current
+        self.drift += self.rate * (now - self.last_time)
+        self.last_time = now
+        self.written = self.truth + self.drift
+        self.yaw.set(self.written)
+
+
+def apply_noise(noise: dict, robot, engine) -> None:
+    """`autosim.run_mode()` setup hook that applies `noise` to `robot`"""
+    import hal.simulation
+    from wpimath.geometry import Rotation2d, Transform2d
+
+    import physics
+
+    rng = random.Random(noise["seed"])
+    for camera in robot.vision.cameras:
+        camera.getLatestResult = CameraNoise(camera, rng, noise)
+
+    # the robot still believes it starts at the origin
+    if engine is not None:
+        engine.reset_pose(
+            physics.START_POSE.transformBy(
+                Transform2d(
+                    noise["start_x"],
+                    noise["start_y"],
+                    Rotation2d.fromDegrees(noise["start_heading"]),
+                )
+            )
+        )
+    # kept on the robot, since the HAL only holds a handle to the callback
+    robot.gyro_drift = GyroDrift(noise["gyro_drift"])
+    robot.gyro_drift_callback = hal.simulation.registerSimPeriodicAfterCallback(
+        robot.gyro_drift
+    )
+
+    robot.drivetrain.output_gain = noise["motor_gain"]
+
+
+def summarize(results: list[dict]) -> dict:
+    times = np.array(
+        [r["completion_time"] for r in results if r["completion_time"] is not None]
+    )
+    stuck = collections.Counter(
+        r["final_state"] if r["error"] is None else "error"
+        for r in results
+        if r["completion_time"] is None
+    )
+    summary = {
+        "runs": len(results),
+        "success_rate": len(times) / len(results),
+        "stuck": dict(stuck.most_common()),
+    }
+    if len(times) > 0:
+        summary["completion_time"] = {
+            "mean": float(times.mean()),
+            "std": float(times.std()),
+            "min": float(times.min()),
+            "p50": float(np.percentile(times, 50)),
+            "p95": float(np.percentile(times, 95)),
+            "max": float(times.max()),
+        }
+    return summary
+
+
+def print_summary(mode: str, summary: dict) -> None:
+    print(f"{mode}: {summary['success_rate']:.0%} of {summary['runs']} runs finished")
+    if "completion_time" in summary:
+        t = summary["completion_time"]
+        print(
+            f"    completion time: mean {t['mean']:.2f} s, std {t['std']:.2f} s, "
+            f"min {t['min']:.2f} s, p50 {t['p50']:.2f} s, p95 {t['p95']:.2f} s, "
+            f"max {t['max']:.2f} s"
+        )
+    for state, count in summary["stuck"].items():
+        print(f"    stuck in {state}: {count / summary['runs']:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modes", nargs="*", help="modes to run (default: all)")
+    parser.add_argument("--runs", type=int, default=200, help="runs per mode")
+    parser.add_argument("--seed", type=int, default=5113)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument(
+        "--timeout", type=float, default=60.0, help="real time allowed per run"
+    )
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    modes = args.modes or autosim.find_modes()
+    rng = random.Random(args.seed)
+    tasks = [
+        (mode, args.duration, functools.partial(apply_noise, sample_noise(rng)))
+        for mode in modes
+        for _ in range(args.runs)
+    ]
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(args.jobs, maxtasksperchild=1) as pool:
+        results = autosim.run_all(pool, tasks, args.timeout)
+
+    report = {}
+    for mode in modes:
+        mode_results = [r for r in results if r["mode"] == mode]
+        report[mode] = summarize(mode_results)
+        print_summary(mode, report[mode])
+        # kept with the noise of each run, so failures can be traced back
+        # to the noise that caused them
+        report[mode]["results"] = [
+            dict(result, noise=setup.args[0])
+            for (_, _, setup), result in zip(tasks, results)
+            if result["mode"] == mode
+        ]
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
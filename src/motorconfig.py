@@ -0,0 +1,206 @@
+"""Configuration of the motor controllers at startup.
+
+Each setting is a blocking round trip on the CAN bus, so configuring every
+controller one call at a time holds up `robotInit()`. Instead, the
+components queue their settings in `setup()` with `MotorConfig.add()`,
+and the robot sends them all with `MotorConfig.apply()` once every
+component is set up: each controller is configured on a worker thread,
+so the controllers are configured in parallel and only the calls to one
+controller wait on each other.
+
+Spark Maxes keep their settings in flash, so after a Spark Max is
+configured its settings are burned to flash and a hash of them is saved
+to `motor_config.json` in the operating directory. On the next startup,
+a Spark Max whose settings hash the same is left alone if it also reads
+back the settings that can be read, such as its idle mode, inversion
+and soft limits. A controller swapped in under the same CAN ID has its
+factory settings, so it is configured again. Other controllers are
+configured every time. Nothing is cached in simulation, where the
+controllers start out unconfigured.
+"""
+
+import concurrent.futures
+import hashlib
+import json
+import math
+import os
+import time
+
+import wpilib
+from rev import REVLibError
+
+CACHE_FILE = "motor_config.json"
+MAX_WORKERS = 8
+# getter that reads back what each setting sets, called with the
+# setting's arguments but the last
+READBACKS = {
+    "setIdleMode": "getIdleMode",
+    "setInverted": "getInverted",
+    "setSoftLimit": "getSoftLimit",
+    "enableSoftLimit": "isSoftLimitEnabled",
+    "setPositionConversionFactor": "getPositionConversionFactor",
+    "setVelocityConversionFactor": "getVelocityConversionFactor",
+    "setP": "getP",
+    "setFF": "getFF",
+}
+
+
+def get_device_name(device) -> str:
+    if hasattr(device, "getDeviceId"):
+        # REV
+        device_id = device.getDeviceId()
+    elif hasattr(device, "getDeviceID"):
+        # Phoenix 5
+        device_id = device.getDeviceID()
+    else:
+        # Phoenix 6
+        device_id = device.device_id
+    return f"{type(device).__name__} [{device_id}]"
+
+
+def failed(result) -> bool:
+    """Returns whether a setting call returned an error"""
+    if result is None:
+        return False
+    if isinstance(result, REVLibError):
+        return result != REVLibError.kOk
+    # Phoenix 6 StatusCode
+    is_ok = getattr(result, "is_ok", None)
+    return is_ok is not None and not is_ok()
+
+
+class MotorConfig:
+    """Settings of the motor controllers, sent together by `apply()`"""
+
+    def __init__(self, cache_path: str | None = None):
+        self.cache_path = cache_path
+        # settings of each device, in the order they were added
+        self.devices = {}
+        self.settings = {}
+
+    def add(self, device, setting: str, *args, target=None) -> None:
+        """Queues the call `setting(*args)` on `target`, which is a part
+        of `device` such as its encoder, or `device` itself
+        """
+        name = get_device_name(device)
+        if name not in self.devices:
+            self.devices[name] = device
+            self.settings[name] = []
+        self.settings[name].append(
+            (device if target is None else target, setting, args)
+        )
+
+    def get_hash(self, name: str) -> str:
+        calls = [
+            (type(target).__name__, setting, repr(args))
+            for target, setting, args in self.settings[name]
+        ]
+        return hashlib.sha1(repr(calls).encode()).hexdigest()
+
+    def load_cache(self) -> dict[str, str]:
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_cache(self, cache: dict[str, str]) -> None:
+        if self.cache_path is None:
+            return
+        try:
+            with open(self.cache_path, "w") as f:
+                json.dump(cache, f, indent=4)
+        except OSError as e:
+            print(f"Could not save motor controller config cache: {e}")
+
+    def reads_back(self, name: str) -> bool:
+        """Returns whether device `name` reads back every setting queued
+        for it that has a getter in `READBACKS`
+        """
+        for target, setting, args in self.settings[name]:
+            getter = READBACKS.get(setting)
+            if getter is None:
+                continue
+            *key, expected = args
+            try:
+                actual = getattr(target, getter)(*key)
+            except Exception:
+                return False
+            # the devices store numbers as 32-bit floats
+            if isinstance(expected, (int, float)) and not isinstance(expected, bool):
+                if not math.isclose(actual, expected, rel_tol=1e-5, abs_tol=1e-6):
+                    return False
+            elif actual != expected:
+                return False
+        return True
+
+    def update(self, name: str, cached: bool) -> bool | None:
+        """Configures device `name`, unless its settings are `cached` and
+        it reads them back. Returns `None` if it was left alone, and
+        otherwise whether it was configured. Runs on a worker thread.
+        """
+        if cached and self.reads_back(name):
+            return None
+        return self.configure(name)
+
+    def configure(self, name: str) -> bool:
+        """Makes the calls queued for device `name`, returning whether
+        they all succeeded. Runs on a worker thread.
+        """
+        ok = True
+        for target, setting, args in self.settings[name]:
+            try:
+                result = getattr(target, setting)(*args)
+            except Exception as e:
+                wpilib.reportError(f"{name}: {setting}{args} raised {e!r}")
+                ok = False
+                continue
+            if failed(result):
+                wpilib.reportWarning(f"{name}: {setting}{args} returned {result}")
+                ok = False
+        device = self.devices[name]
+        if ok and self.cache_path is not None and hasattr(device, "burnFlash"):
+            ok = not failed(device.burnFlash())
+        return ok
+
+    def apply(self) -> None:
+        """Configures every device whose settings are not cached, or that
+        does not read them back, in parallel, and blocks until all of
+        them are configured
+        """
+        start = time.perf_counter()
+        cache = self.load_cache()
+        hashes = {name: self.get_hash(name) for name in self.settings}
+        names = list(self.devices)
+        cached = [
+            hasattr(self.devices[name], "burnFlash") and cache.get(name) == hashes[name]
+            for name in names
+        ]
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=MAX_WORKERS, thread_name_prefix="motorconfig"
+        ) as executor:
+            results = dict(zip(names, executor.map(self.update, names, cached)))
+
+        configured = 0
+        for name, ok in results.items():
+            if ok is None:
+                continue
+            configured += 1
+            if ok and hasattr(self.devices[name], "burnFlash"):
+                cache[name] = hashes[name]
+            else:
+                cache.pop(name, None)
+        self.save_cache(cache)
+        print(
+            f"Configured {configured} of {len(self.devices)} motor controllers "
+            f"({len(self.devices) - configured} cached) "
+            f"in {time.perf_counter() - start:.3f} s"
+        )
+
+
+def new_motor_config() -> MotorConfig:
+    if wpilib.RobotBase.isSimulation():
+        return MotorConfig()
+    return MotorConfig(os.path.join(wpilib.getOperatingDirectory(), CACHE_FILE))
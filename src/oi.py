@@ -1,7 +1,158 @@
 import wpilib
 
+# XboxController axis and button numbers
+LEFT_X = 0
+LEFT_Y = 1
+LEFT_TRIGGER = 2
+RIGHT_TRIGGER = 3
+RIGHT_X = 4
+RIGHT_Y = 5
+A = 1
+B = 2
+X = 3
+Y = 4
+LEFT_BUMPER = 5
+RIGHT_BUMPER = 6
+BACK = 7
+START = 8
+# most axes the driver station sends for a controller
+MAX_AXES = 12
+
+
+class ControllerSnapshot:
+    """Every axis, button and the POV of the controller on `port`, read
+    from the driver station once per tick by `update()`. Button numbers
+    start at 1, as in `GenericHID`. Also has the getters of
+    `XboxController` and `Joystick` used by the OIs.
+    """
+
+    def __init__(self, port: int):
+        self.port = port
+        self.axes = [0.0] * MAX_AXES
+        self.buttons = 0
+        self.last_buttons = 0
+        self.pov = -1
+
+    def update(self) -> None:
+        ds = wpilib.DriverStation
+        self.last_buttons = self.buttons
+        # every button comes in one bitmask
+        self.buttons = ds.getStickButtons(self.port)
+        count = min(ds.getStickAxisCount(self.port), len(self.axes))
+        for i in range(count):
+            self.axes[i] = ds.getStickAxis(self.port, i)
+        for i in range(count, len(self.axes)):
+            self.axes[i] = 0.0
+        self.pov = (
+            ds.getStickPOV(self.port, 0) if ds.getStickPOVCount(self.port) else -1
+        )
+
+    def reset(self) -> None:
+        """Takes the buttons held now as already held, so that no edge
+        is seen on the next `update()` for a button held since before
+        it. Call when the snapshots start being taken again, as the last
+        one may be from long ago.
+        """
+        self.buttons = self.last_buttons = wpilib.DriverStation.getStickButtons(
+            self.port
+        )
+
+    def axis(self, axis: int) -> float:
+        return self.axes[axis]
+
+    def button(self, button: int) -> bool:
+        return bool(self.buttons >> (button - 1) & 1)
+
+    def pressed(self, *buttons: int) -> bool:
+        """Returns `True` on the tick `buttons` start being held
+        together
+        """
+        mask = 0
+        for button in buttons:
+            mask |= 1 << (button - 1)
+        return self.buttons & mask == mask and self.last_buttons & mask != mask
+
+    def released(self, button: int) -> bool:
+        """Returns `True` on the tick `button` is released"""
+        mask = 1 << (button - 1)
+        return bool(self.last_buttons & mask and not self.buttons & mask)
+
+    def getPOV(self) -> int:
+        return self.pov
+
+    def getRawButton(self, button: int) -> bool:
+        return self.button(button)
+
+    def getX(self) -> float:
+        return self.axes[0]
+
+    def getY(self) -> float:
+        return self.axes[1]
+
+    def getLeftX(self) -> float:
+        return self.axes[LEFT_X]
+
+    def getLeftY(self) -> float:
+        return self.axes[LEFT_Y]
+
+    def getRightX(self) -> float:
+        return self.axes[RIGHT_X]
+
+    def getRightY(self) -> float:
+        return self.axes[RIGHT_Y]
+
+    def getLeftTriggerAxis(self) -> float:
+        return self.axes[LEFT_TRIGGER]
+
+    def getRightTriggerAxis(self) -> float:
+        return self.axes[RIGHT_TRIGGER]
+
+    def getAButton(self) -> bool:
+        return self.button(A)
+
+    def getBButton(self) -> bool:
+        return self.button(B)
+
+    def getXButton(self) -> bool:
+        return self.button(X)
+
+    def getYButton(self) -> bool:
+        return self.button(Y)
+
+    def getLeftBumper(self) -> bool:
+        return self.button(LEFT_BUMPER)
+
+    def getRightBumper(self) -> bool:
+        return self.button(RIGHT_BUMPER)
+
+    def getBackButton(self) -> bool:
+        return self.button(BACK)
+
+    def getStartButton(self) -> bool:
+        return self.button(START)
+
 
 class OI_Base:
+    """Operator input. `update()` must be called once at the start of
+    each tick, after which every method reads the snapshots it took.
+    """
+
+    controllers: list[ControllerSnapshot] = []
+    # FPGA time of the driver station data of the snapshots (s)
+    timestamp = 0.0
+
+    def update(self) -> None:
+        """Takes a snapshot of every controller"""
+        for controller in self.controllers:
+            controller.update()
+        # driver station data is refreshed at the start of each loop
+        self.timestamp = wpilib.Timer.getFPGATimestamp()
+
+    def reset(self) -> None:
+        """Call before the first `update()` of each enable"""
+        for controller in self.controllers:
+            controller.reset()
+
     def drive_forward(self) -> float:
         return 0
 
@@ -46,11 +197,29 @@ class OI_Base:
     def run_intake_always(self) -> bool:
         return False
 
+    def contract_left_climber(self) -> bool:
+        return False
+
+    def contract_right_climber(self) -> bool:
+        return False
+
+    def extend_left_climber(self) -> bool:
+        return False
+
+    def extend_right_climber(self) -> bool:
+        return False
+
+    def source_intake(self) -> bool:
+        return False
+
+    def override_intake_disable(self) -> bool:
+        return False
+
+
 class Single_Xbox_OI(OI_Base):
-    def __init__(
-        self, xbox_port_1: int = 0, deadband: float = 0.1
-    ):
-        self.xbox1 = wpilib.XboxController(xbox_port_1)
+    def __init__(self, xbox_port_1: int = 0, deadband: float = 0.1):
+        self.xbox1 = ControllerSnapshot(xbox_port_1)
+        self.controllers = [self.xbox1]
         self.deadband = deadband
 
     def drive_forward(self):
@@ -60,10 +229,10 @@ class Single_Xbox_OI(OI_Base):
         return -self.xbox1.getRightX()
 
     def soft_shoot(self):
-        return self.xbox1.getBButton()
+        return self.xbox1.pressed(B)
 
     def hard_shoot(self):
-        return self.xbox1.getBButton() and self.xbox1.getAButton()
+        return self.xbox1.pressed(B, A)
 
     def intake(self):
         return self.xbox1.getXButton()
@@ -88,7 +257,7 @@ class Single_Xbox_OI(OI_Base):
 
     def source_intake(self):
         return self.xbox1.getStartButton()
-    
+
     def override_intake_disable(self):
         return False
 
@@ -97,8 +266,9 @@ class Double_Xbox_OI(OI_Base):
     def __init__(
         self, xbox_port_1: int = 0, xbox_port_2: int = 1, deadband: float = 0.1
     ):
-        self.xbox1 = wpilib.XboxController(xbox_port_1)
-        self.xbox2 = wpilib.XboxController(xbox_port_2)
+        self.xbox1 = ControllerSnapshot(xbox_port_1)
+        self.xbox2 = ControllerSnapshot(xbox_port_2)
+        self.controllers = [self.xbox1, self.xbox2]
         self.deadband = deadband
 
     def drive_forward(self):
@@ -108,10 +278,10 @@ class Double_Xbox_OI(OI_Base):
         return -self.xbox1.getRightX()
 
     def soft_shoot(self):
-        return self.xbox2.getBButton()
+        return self.xbox2.pressed(B)
 
     def hard_shoot(self):
-        return self.xbox2.getBButton() and self.xbox2.getAButton()
+        return self.xbox2.pressed(B, A)
 
     def intake(self):
         return self.xbox2.getXButton()
@@ -132,7 +302,7 @@ class Double_Xbox_OI(OI_Base):
         return self.xbox1.getXButton()
 
     def cancel_align(self):
-        return self.xbox1.getBButton()
+        return self.xbox1.pressed(B)
 
     def contract_climbers(self):
         return self.xbox2.getRightY() > self.deadband
@@ -156,7 +326,7 @@ class Double_Xbox_OI(OI_Base):
         return self.xbox2.getStartButton()
 
     def override_intake_disable(self):
-        return self.xbox1.getStartButton()
+        return self.xbox1.pressed(START)
 
     # def test(self):
     # return self.xbox1.get
@@ -164,7 +334,8 @@ class Double_Xbox_OI(OI_Base):
 
 class Joystick_OI(OI_Base):
     def __init__(self, joystick_port: int = 1):
-        self.joystick = wpilib.Joystick(joystick_port)
+        self.joystick = ControllerSnapshot(joystick_port)
+        self.controllers = [self.joystick]
 
     def drive_forward(self):
         return self.joystick.getY()
@@ -193,8 +364,9 @@ class Joystick_OI(OI_Base):
 
 class Sim_OI(OI_Base):
     def __init__(self, keyboard_port_left: int = 0, keyboard_port_right: int = 1):
-        self.keyboard_left = wpilib.Joystick(keyboard_port_left)
-        self.keyboard_right = wpilib.Joystick(keyboard_port_right)
+        self.keyboard_left = ControllerSnapshot(keyboard_port_left)
+        self.keyboard_right = ControllerSnapshot(keyboard_port_right)
+        self.controllers = [self.keyboard_left, self.keyboard_right]
 
     def drive_forward(self) -> float:
         return self.keyboard_left.getY()
@@ -0,0 +1,226 @@
+"""Physics model of the robot, loaded by pyfrc when the robot is
+simulated. Each mechanism is driven by the outputs of its motor
+controllers and writes back the sensors the robot code reads:
+
+drivetrain -- differential drivetrain driven by the four drive Spark
+    Maxes; sets their encoders and the navX yaw
+intake -- single-jointed arm driven by the two joint Spark Maxes; sets
+    the two DutyCycleEncoders. The belt Talon FX spins a flywheel.
+shooter -- flywheels driven by the shooter Spark Maxes and the belt
+    Spark Max; set their encoders
+climbers -- elevators driven by the climber Spark Maxes; set their
+    encoders and limit switches
+cameras -- `sim.photon.SimCamera`s that see the field's AprilTags from
+    the simulated pose
+
+Notes are not modelled, so nothing is ever detected in the intake or
+shooter belt. The model has no noise, so the simulation is
+deterministic.
+"""
+
+import math
+import typing
+
+import wpilib
+from wpilib.simulation import (
+    DIOSim,
+    DifferentialDrivetrainSim,
+    DutyCycleEncoderSim,
+    ElevatorSim,
+    FlywheelSim,
+    SimDeviceSim,
+    SingleJointedArmSim,
+)
+from wpimath.geometry import Pose2d, Rotation2d
+from wpimath.system.plant import DCMotor
+from pyfrc.physics.core import PhysicsInterface
+
+from components.drivetrain import GEAR_RATIO, WHEEL_DIAMETER
+from components.intake import Intake
+from sim.photon import SimCamera
+
+if typing.TYPE_CHECKING:
+    from robot import MyRobot
+
+# intake arm: gearing and inertia chosen to match the gains of
+# `Intake.feedforward`
+INTAKE_GEARING = 38.6
+INTAKE_MOI = 0.19
+INTAKE_LENGTH = 0.4
+
+# climbers: 270 motor rotations raise the hooks 0.6 m
+CLIMBER_GEARING = 36
+CLIMBER_DRUM_RADIUS = 0.0127
+CLIMBER_HEIGHT = 0.6
+CLIMBER_METERS_PER_ROTATION = 2 * math.pi * CLIMBER_DRUM_RADIUS / CLIMBER_GEARING
+
+# the robot starts facing the blue speaker, so its tags are in view
+START_POSE = Pose2d(1.4, 5.55, Rotation2d.fromDegrees(180))
+
+
+def get_output(motor) -> float:
+    """Returns the output of `motor`, in the direction the motor turns"""
+    if motor.getInverted():
+        return -motor.get()
+    return motor.get()
+
+
+def intake_angle(position: float) -> float:
+    """Converts an intake position (0 is up) to an arm angle from
+    horizontal, as `Intake.get_radians()` does
+    """
+    return -(position - Intake.horizontal_offset) * 2 * math.pi
+
+
+class SparkMaxSensors:
+    """Writes the encoder of a simulated Spark Max"""
+
+    def __init__(self, device_id: int):
+        device = SimDeviceSim(f"SPARK MAX [{device_id}]")
+        self.position = device.getDouble("Position")
+        self.velocity = device.getDouble("Velocity")
+
+    def set(self, position: float, velocity: float) -> None:
+        self.position.set(position)
+        self.velocity.set(velocity)
+
+
+class PhysicsEngine:
+    def __init__(self, physics_controller: PhysicsInterface, robot: "MyRobot"):
+        self.physics_controller = physics_controller
+        self.robot = robot
+
+        self.drivetrain = DifferentialDrivetrainSim.createKitbotSim(
+            DifferentialDrivetrainSim.KitbotMotor.DualNEOPerSide,
+            GEAR_RATIO,
+            WHEEL_DIAMETER,
+        )
+        self.left_drive_sensors = SparkMaxSensors(5)
+        self.right_drive_sensors = SparkMaxSensors(50)
+        self.yaw = SimDeviceSim("navX-Sensor[4]").getDouble("Yaw")
+
+        self.intake = SingleJointedArmSim(
+            DCMotor.NEO(2),
+            INTAKE_GEARING,
+            INTAKE_MOI,
+            INTAKE_LENGTH,
+            intake_angle(Intake.upper_limit),
+            intake_angle(Intake.lower_limit),
+            True,
+            intake_angle(Intake.lower_limit),
+        )
+        self.intake_left_encoder = DutyCycleEncoderSim(robot.intake_left_encoder)
+        self.intake_right_encoder = DutyCycleEncoderSim(robot.intake_right_encoder)
+        self.intake_left_encoder.setConnected(True)
+        self.intake_right_encoder.setConnected(True)
+        self.intake_belt = FlywheelSim(DCMotor.falcon500(1), 1, 0.0005)
+        self.intake_belt_state = robot.intake_belt_motor.sim_state
+
+        self.shooter = FlywheelSim(DCMotor.NEO(2), 1, 0.004)
+        self.shooter_sensors = [SparkMaxSensors(53), SparkMaxSensors(54)]
+        self.shooter_belt = FlywheelSim(DCMotor.NEO(1), 1, 0.0005)
+        self.shooter_belt_sensors = SparkMaxSensors(55)
+
+        self.climbers = [
+            ElevatorSim(
+                DCMotor.NEO(1),
+                CLIMBER_GEARING,
+                1.0,
+                CLIMBER_DRUM_RADIUS,
+                0.0,
+                CLIMBER_HEIGHT,
+                False,
+                0.0,
+            )
+            for _ in range(2)
+        ]
+        self.climber_sensors = [SparkMaxSensors(56), SparkMaxSensors(57)]
+        self.climber_limit_switches = [DIOSim(4), DIOSim(5)]
+
+        self.cameras = []
+        for seed, camera in enumerate(
+            [robot.vision_left_camera, robot.vision_right_camera]
+        ):
+            sim_camera = SimCamera(camera, self.drivetrain.getPose, seed=seed)
+            camera.getLatestResult = sim_camera
+            self.cameras.append(sim_camera)
+
+        self.reset_pose(START_POSE)
+
+    def reset_pose(self, pose: Pose2d) -> None:
+        """Moves the simulated robot to `pose` on the field"""
+        self.drivetrain.setPose(pose)
+        self.physics_controller.field.setRobotPose(pose)
+        self.yaw.set(-pose.rotation().degrees())
+
+    def update_sim(self, now: float, tm_diff: float) -> None:
+        robot = self.robot
+        voltage = wpilib.RobotController.getBatteryVoltage()
+
+        # the right side is mirrored, so it turns backwards to drive
+        # forwards
+        self.drivetrain.setInputs(
+            get_output(robot.drivetrain_front_left_motor) * voltage,
+            -get_output(robot.drivetrain_front_right_motor) * voltage,
+        )
+        self.drivetrain.update(tm_diff)
+        pose = self.drivetrain.getPose()
+        self.physics_controller.field.setRobotPose(pose)
+        self.yaw.set(-pose.rotation().degrees())
+        # the drive encoders measure meters (see `Drivetrain.setup()`)
+        self.left_drive_sensors.set(
+            self.drivetrain.getLeftPosition(), self.drivetrain.getLeftVelocity()
+        )
+        self.right_drive_sensors.set(
+            -self.drivetrain.getRightPosition(), -self.drivetrain.getRightVelocity()
+        )
+
+        self.intake.setInputVoltage(get_output(robot.intake_joint_left_motor) * voltage)
+        self.intake.update(tm_diff)
+        position = (
+            Intake.horizontal_offset - self.intake.getAngle() / (2 * math.pi)
+        ) % 1
+        self.intake_left_encoder.setAbsolutePosition(
+            (position + robot.intake_left_encoder_offset) % 1
+        )
+        self.intake_right_encoder.setAbsolutePosition(
+            (position + robot.intake_right_encoder_offset) % 1
+        )
+        self.intake_belt_state.set_supply_voltage(voltage)
+        self.intake_belt.setInputVoltage(self.intake_belt_state.motor_voltage)
+        self.intake_belt.update(tm_diff)
+        self.intake_belt_state.set_rotor_velocity(
+            self.intake_belt.getAngularVelocity() / (2 * math.pi)
+        )
+
+        self.shooter.setInputVoltage(
+            get_output(robot.shooter_shooter_left_motor) * voltage
+        )
+        self.shooter.update(tm_diff)
+        for sensors in self.shooter_sensors:
+            sensors.set(0, self.shooter.getAngularVelocityRPM())
+        self.shooter_belt.setInputVoltage(
+            get_output(robot.shooter_belt_motor) * voltage
+        )
+        self.shooter_belt.update(tm_diff)
+        self.shooter_belt_sensors.set(0, self.shooter_belt.getAngularVelocityRPM())
+
+        # the left climber contracts with positive output and counts
+        # down as it extends, the right one is the other way around
+        directions = [-1, 1]
+        motors = [robot.climber_left_motor, robot.climber_right_motor]
+        for climber, sensors, limit_switch, motor, direction in zip(
+            self.climbers,
+            self.climber_sensors,
+            self.climber_limit_switches,
+            motors,
+            directions,
+        ):
+            climber.setInputVoltage(direction * get_output(motor) * voltage)
+            climber.update(tm_diff)
+            sensors.set(
+                direction * climber.getPosition() / CLIMBER_METERS_PER_ROTATION,
+                direction * climber.getVelocity() / CLIMBER_METERS_PER_ROTATION * 60,
+            )
+            # the switches are pressed at the bottom and read low then
+            limit_switch.setValue(climber.getPosition() >= 0.005)
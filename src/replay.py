@@ -0,0 +1,342 @@
+"""Replays a match recorded by `datalog.MatchLog` through the components,
+tick for tick, and compares what they command with what the robot
+commanded during the match:
+
+    python replay.py [--json FILE] LOG
+
+Each tick, the recorded sensor values replace what the components read
+in the read phase, the recorded camera results replace the cameras'
+results and the recorded operator inputs replace the OI, so filters and
+controllers run on exactly the data they saw on the field. Changes to
+them show up as differences in the commands. Vision is replayed from
+the raw camera results, so its filters run again too.
+
+The simulated clock is stepped without a robot loop thread, so a match
+replays far faster than real time. Teleop and disabled ticks are
+replayed; autonomous and test ticks are skipped, since the autonomous
+mode and test routines are not recorded. Ticks that lost records the
+robot dropped while logging are skipped too.
+"""
+
+import argparse
+import bisect
+import json
+import math
+import os
+import time
+
+import wpilib
+from wpilib.simulation import pauseTiming, restartTiming, stepTimingAsync
+from photonlibpy.photonPipelineResult import PhotonPipelineResult
+from photonlibpy.photonTrackedTarget import PhotonTrackedTarget
+from wpimath.geometry import Rotation2d, Rotation3d, Transform3d, Translation3d
+
+import datalog
+
+# commands closer than this are taken as equal
+TOLERANCE = 1e-6
+
+
+class Recording:
+    """The signals of a log, indexed by the ticks of the robot loop. The
+    writer drops records one at a time when its buffer is full, so the
+    signals logged every loop (the doubles) are matched to the ticks by
+    timestamp, and a tick that lost any of its records is incomplete.
+    """
+
+    def __init__(self, signals: dict[str, tuple[list[int], list]]):
+        self.signals = signals
+        # the value of each signal logged every loop by timestamp
+        self.loop_signals = {}
+        ticks = set()
+        for name, (timestamps, values) in signals.items():
+            if values and isinstance(values[0], float):
+                self.loop_signals[name] = dict(zip(timestamps, values))
+                ticks.update(timestamps)
+        self.ticks = sorted(ticks)
+        self.complete = [
+            all(timestamp in signal for signal in self.loop_signals.values())
+            for timestamp in self.ticks
+        ]
+
+    def value(self, name: str, tick: int):
+        """Returns the value of a signal logged every loop, or NaN if its
+        record was dropped
+        """
+        return self.loop_signals[name].get(self.ticks[tick], math.nan)
+
+    def latest(self, name: str, tick: int):
+        """Returns the last value of a signal logged on change, or `None`
+        if none has been logged yet
+        """
+        timestamps, values = self.signals.get(name, ([], []))
+        i = bisect.bisect_right(timestamps, self.ticks[tick]) - 1
+        if i < 0:
+            return None
+        return values[i]
+
+
+class ReplayGyro:
+    """Stands in for the navX with the recorded angle. The recorded angle
+    is already relative to any reset made during the match.
+    """
+
+    def __init__(self):
+        self.angle = 0.0
+
+    def getAngle(self) -> float:
+        return self.angle
+
+    def getRotation2d(self) -> Rotation2d:
+        # the navX's angle is clockwise positive
+        return Rotation2d.fromDegrees(-self.angle)
+
+    def reset(self) -> None:
+        pass
+
+
+class ReplayOI:
+    """Stands in for the OI with the recorded operator inputs"""
+
+    timestamp = 0.0
+
+    def __init__(self):
+        self.values = {name: 0.0 for name in datalog.OI_METHODS}
+
+    def update(self) -> None:
+        pass
+
+    def reset(self) -> None:
+        pass
+
+    def __getattr__(self, name: str):
+        values = self.__dict__["values"]
+        if name not in values:
+            raise AttributeError(name)
+        if name in ("drive_forward", "drive_turn"):
+            return lambda: values[name]
+        return lambda: values[name] != 0
+
+
+def make_result(values: list[float], timestamp: float) -> PhotonPipelineResult:
+    """Rebuilds a camera result logged as [latency, id, x, y, z,
+    ambiguity, ...]
+    """
+    targets = []
+    for i in range(1, len(values), 5):
+        fiducial_id, x, y, z, ambiguity = values[i : i + 5]
+        transform = Transform3d(Translation3d(x, y, z), Rotation3d())
+        targets.append(
+            PhotonTrackedTarget(
+                fiducialId=int(fiducial_id),
+                bestCameraToTarget=transform,
+                altCameraToTarget=transform,
+                poseAmbiguity=ambiguity,
+            )
+        )
+    return PhotonPipelineResult(
+        latencyMillis=values[0], timestampSec=timestamp, targets=targets
+    )
+
+
+class Replay:
+    """Runs `robot`'s components on `recording`"""
+
+    def __init__(self, robot, recording: Recording):
+        self.robot = robot
+        self.recording = recording
+        self.tick = 0
+
+        self.gyro = ReplayGyro()
+        robot.gyro = self.gyro
+        for _, component in robot._components:
+            if hasattr(component, "gyro"):
+                component.gyro = self.gyro
+        self.oi = ReplayOI()
+        robot.oi = self.oi
+        # nothing is logged while replaying
+        robot.log_loop = lambda: None
+
+        robot.drivetrain.read = self.read_drivetrain
+        robot.intake.read = self.read_intake
+        robot.shooter.read = self.read_shooter
+        robot.climber.read = self.read_climber
+        self.camera_results = {}
+        for camera in robot.vision.cameras:
+            camera.getLatestResult = self.camera_reader(camera.getName())
+
+        self.commands = datalog.command_signals(robot)
+        self.mismatches = {name: 0 for name, _ in self.commands}
+        self.max_errors = {name: 0.0 for name, _ in self.commands}
+
+    def read_drivetrain(self) -> None:
+        drivetrain = self.robot.drivetrain
+        value = self.recording.value
+        drivetrain.left_position = value("drivetrain/left_position", self.tick)
+        drivetrain.right_position = value("drivetrain/right_position", self.tick)
+        drivetrain.left_velocity = value("drivetrain/left_velocity", self.tick)
+        drivetrain.right_velocity = value("drivetrain/right_velocity", self.tick)
+        drivetrain.angle = self.gyro.angle
+        # the navX's angle is clockwise positive
+        drivetrain.pose = drivetrain.odometry.update(
+            Rotation2d.fromDegrees(-drivetrain.angle),
+            drivetrain.left_position,
+            drivetrain.right_position,
+        )
+
+    def read_intake(self) -> None:
+        intake = self.robot.intake
+        position = self.recording.value("intake/position", self.tick)
+        intake.last_position = intake.position
+        intake.position = None if math.isnan(position) else position
+        intake.belt_velocity = self.recording.value("intake/belt_velocity", self.tick)
+        intake.filtered_motor_speed = intake.motor_speed_filter.calculate(
+            intake.belt_velocity
+        )
+
+    def read_shooter(self) -> None:
+        shooter = self.robot.shooter
+        shooter.belt_velocity = self.recording.value("shooter/belt_velocity", self.tick)
+        shooter.filtered_motor_speed = shooter.motor_speed_filter.calculate(
+            shooter.belt_velocity
+        )
+
+    def read_climber(self) -> None:
+        climber = self.robot.climber
+        value = self.recording.value
+        climber.left_position = value("climber/left_position", self.tick)
+        climber.right_position = value("climber/right_position", self.tick)
+        climber.left_limit_pressed = value("climber/left_limit", self.tick) != 0
+        climber.right_limit_pressed = value("climber/right_limit", self.tick) != 0
+
+    def camera_reader(self, name: str):
+        def get_latest_result() -> PhotonPipelineResult:
+            values = self.recording.latest(f"vision/{name}/result", self.tick)
+            if values is None:
+                return PhotonPipelineResult()
+            key = (name, id(values))
+            # rebuilt once, so that the result keeps its identity while
+            # the camera has nothing new
+            if key not in self.camera_results:
+                timestamp = self.recording.ticks[self.tick] / 1e6
+                self.camera_results[key] = make_result(values, timestamp)
+            return self.camera_results[key]
+
+        return get_latest_result
+
+    def compare(self) -> None:
+        for name, get in self.commands:
+            replayed = get()
+            recorded = self.recording.value(name, self.tick)
+            if math.isnan(replayed) and math.isnan(recorded):
+                continue
+            error = abs(replayed - recorded)
+            if math.isnan(error) or error > TOLERANCE:
+                self.mismatches[name] += 1
+                if not math.isnan(error):
+                    self.max_errors[name] = max(self.max_errors[name], error)
+                else:
+                    self.max_errors[name] = math.inf
+
+    def run(self) -> dict:
+        robot = self.robot
+        recording = self.recording
+        mode = None
+        replayed = 0
+        skipped = 0
+        incomplete = 0
+        last = recording.ticks[0]
+        for tick, timestamp in enumerate(recording.ticks):
+            self.tick = tick
+            stepTimingAsync((timestamp - last) / 1e6)
+            last = timestamp
+            # the components would run on made-up sensor values
+            if not recording.complete[tick]:
+                incomplete += 1
+                continue
+            self.gyro.angle = recording.value("gyro/angle", tick)
+            for name in datalog.OI_METHODS:
+                self.oi.values[name] = recording.value(f"oi/{name}", tick)
+            self.oi.timestamp = timestamp / 1e6
+
+            new_mode = recording.latest("robot/mode", tick)
+            if new_mode != mode:
+                if new_mode == "disabled":
+                    robot._on_mode_disable_components()
+                    robot.disabledInit()
+                elif new_mode == "teleop":
+                    robot._on_mode_enable_components()
+                    robot.teleopInit()
+                mode = new_mode
+            if mode == "teleop":
+                robot.teleopPeriodic()
+                robot._enabled_periodic()
+                self.compare()
+            elif mode == "disabled":
+                robot.disabledPeriodic()
+            else:
+                skipped += 1
+                continue
+            replayed += 1
+
+        return {
+            "ticks": len(recording.ticks),
+            "replayed": replayed,
+            "skipped": skipped,
+            "incomplete": incomplete,
+            "match_time": (recording.ticks[-1] - recording.ticks[0]) / 1e6,
+            "mismatches": self.mismatches,
+            "max_errors": self.max_errors,
+        }
+
+
+def replay(path: str) -> dict:
+    from robot import MyRobot
+
+    recording = Recording(datalog.read_log(path))
+    pauseTiming()
+    restartTiming()
+    wpilib.DriverStation.silenceJoystickConnectionWarning(True)
+    robot = MyRobot()
+    robot.robotInit()
+    # the robot opens a log of its own, which is not wanted
+    robot.datalog.close()
+    os.remove(robot.datalog.path)
+
+    start = time.perf_counter()
+    result = Replay(robot, recording).run()
+    result["replay_time"] = time.perf_counter() - start
+    return result
+
+
+def print_report(result: dict) -> None:
+    speedup = result["match_time"] / max(result["replay_time"], 1e-9)
+    print(
+        f"replayed {result['replayed']} of {result['ticks']} ticks "
+        f"({result['skipped']} skipped, {result['incomplete']} incomplete) "
+        f"in {result['replay_time']:.2f} s, "
+        f"{speedup:.0f}x real time"
+    )
+    for name, count in result["mismatches"].items():
+        status = "ok" if count == 0 else f"{count} ticks differ"
+        print(f"    {name:<28} {status}", end="")
+        if count:
+            print(f", max error {result['max_errors'][name]:.4g}", end="")
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("log", help="DataLog file recorded by the robot")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    result = replay(args.log)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
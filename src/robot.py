@@ -1,15 +1,22 @@
 #!/usr/bin/env python3
+import os
+
+import startup
+
+# timed from here until the robot has started
+startup.profile.start_imports()
+
 import numpy as np
 
 import wpilib
-from wpilib import DutyCycleEncoder, DigitalInput, DriverStation
-from wpimath import controller
+from wpilib import DutyCycleEncoder, DigitalInput
 from navx import AHRS
 from phoenix5 import WPI_TalonSRX
-from rev import CANSparkMax, CANSparkLowLevel
+from rev import CANSparkLowLevel
 
 # from photonlibpy.photonCamera import PhotonCamera
-from magicbot import MagicRobot, feedback
+from magicbot import MagicRobot, feedback, tunable
+import magicbot.magicrobot
 
 from components.climber import Climber
 from components.drivetrain import Drivetrain
@@ -20,9 +27,22 @@ from components.shooter import Shooter
 from components.shooter_control import ShooterControl
 from components.vision import Vision, SmartCamera
 
+from handoff import NoteHandoff, ShooterState
+import datalog
+import gccontrol
+import latency
+import motorconfig
 import oi
+import scheduler
+import sysid
 import util
 
+# robotInit() loads the autonomous modes with importlib, which the import
+# timing does not see, so loading them is timed as a whole
+magicbot.magicrobot.AutonomousModeSelector = startup.profile.timed("autonomous")(
+    magicbot.magicrobot.AutonomousModeSelector
+)
+
 
 class MyRobot(MagicRobot):
     #
@@ -38,12 +58,30 @@ class MyRobot(MagicRobot):
     shooter: Shooter
     vision: Vision
 
+    # samples where the objects that make the garbage collector run are
+    # allocated, which is too slow for matches
+    trace_allocations = tunable(False)
+
+    @startup.profile.timed("createObjects")
     def createObjects(self):
         """Initialize variables to be injected:"""
         BRUSHLESS = CANSparkLowLevel.MotorType.kBrushless
 
+        if wpilib.RobotBase.isSimulation():
+            # record the CAN frames sent to the motor controllers
+            from sim.rev import SimSparkMax as CANSparkMax
+            from sim.ctre import SimTalonFX as TalonFX
+            from sim.can import FrameLog
+
+            # frames sent by an earlier robot in this process
+            FrameLog.clear()
+        else:
+            from rev import CANSparkMax
+            from util import WPI_TalonFX as TalonFX
 
         self.gyro = AHRS.create_spi()
+        # settings queued by the components' setup(), sent by robotInit()
+        self.motor_config = motorconfig.new_motor_config()
 
         self.climber_left_motor = CANSparkMax(56, BRUSHLESS)
         self.climber_right_motor = CANSparkMax(57, BRUSHLESS)
@@ -63,7 +101,7 @@ class MyRobot(MagicRobot):
         self.intake_right_encoder = DutyCycleEncoder(DigitalInput(1))
         self.intake_left_encoder_offset = 0.882
         self.intake_right_encoder_offset = 0.198
-        self.intake_belt_motor = util.WPI_TalonFX(46)
+        self.intake_belt_motor = TalonFX(46)
 
 
         self.shooter_belt_motor = CANSparkMax(55, BRUSHLESS)
@@ -81,8 +119,25 @@ class MyRobot(MagicRobot):
         )
 
 
+        self.handoff = NoteHandoff()
+        self.shot_table = util.LookupTable.from_csv(
+            os.path.join(wpilib.getDeployDirectory(), "shot_table.csv")
+        )
+
         self.oi = oi.Single_Xbox_OI()
 
+        self.sysid_mechanism_chooser = sysid.make_chooser(list(sysid.MECHANISMS))
+        self.sysid_test_chooser = sysid.make_chooser(sysid.TESTS)
+        wpilib.SmartDashboard.putData("SysId Mechanism", self.sysid_mechanism_chooser)
+        wpilib.SmartDashboard.putData("SysId Test", self.sysid_test_chooser)
+        self.characterization = None
+
+        self.datalog = datalog.DataLogWriter(datalog.new_log_path())
+        self.match_log = None
+        self.input_latency = latency.LatencyMonitor(self)
+        self.gc_control = gccontrol.GCControl()
+        self.scheduler = scheduler.Scheduler(self.onException)
+
         self.drive_curve = util.cubic_curve(
             scalar=0.8, deadband=0.1, max_mag=1, offset=0.15, absolute_offset=False
         )
@@ -90,21 +145,210 @@ class MyRobot(MagicRobot):
             scalar=0.5, deadband=0.1, max_mag=1, offset=0.15, absolute_offset=False
         )
 
-    def robotPeriodic(self) -> None:
-        super().robotPeriodic()
-        self.intake_control.update_shooter_state(self.shooter_control.current_state)
-        self.shooter_control.update_intake_state(self.intake_control.current_state)
+    def robotInit(self) -> None:
+        profile = startup.profile
+        with profile.section("robotInit"):
+            super().robotInit()
+            with profile.section("motor_config"):
+                self.motor_config.apply()
+            for name, component in self._components:
+                on_configured = getattr(component, "on_configured", None)
+                if on_configured is not None:
+                    on_configured()
+        profile.stop_imports()
+        profile.report()
+        self.read_before_autonomous()
+        self.add_tasks()
+        # what is allocated while starting up is kept for the whole match
+        self.gc_control.freeze()
+
+    def add_tasks(self) -> None:
+        """Background work run by `scheduler` in the time the loop has
+        left over, most important first
+        """
+        add = self.scheduler.add
+        add("tunables", self.refresh_tunables, 10, priority=3)
+        # magicbot updates the feedbacks itself while disabled
+        add("feedback", self.update_feedbacks, 10, priority=2, disabled=False)
+        add("health", self.check_health, 2, priority=1)
+        add("latency", self.input_latency.publish, 2)
+        add("gc", self.gc_control.publish, 1)
+        add("scheduler", self.scheduler.publish, 1)
+        add("allocations", self.gc_control.sample, 1, priority=-1)
+
+    def _create_component(self, name: str, ctyp: type, injectables: dict):
+        """Times the creation and `setup()` of each component"""
+        with startup.profile.section(f"create/{name}"):
+            component = super()._create_component(name, ctyp, injectables)
+        setup = getattr(component, "setup", None)
+        if setup is not None:
+            component.setup = startup.profile.timed(f"setup/{name}")(setup)
+        return component
+
+    def read_sensors(self) -> None:
+        """Read phase: calls `read()` on every component that has one.
+        Starts the loop.
+        """
+        self.frame_start = wpilib.Timer.getFPGATimestamp()
+        for name, component in self._components:
+            read = getattr(component, "read", None)
+            if read is not None:
+                try:
+                    read()
+                except:
+                    self.onException()
+        self.watchdog.addEpoch("read")
+
+    def read_before_autonomous(self) -> None:
+        """Runs the read phase before each step of the autonomous mode,
+        which magicbot runs before `_enabled_periodic()`
+        """
+        on_iteration = self._automodes._on_iteration
+
+        def read_then_iterate(time_elapsed: float) -> None:
+            self.read_sensors()
+            on_iteration(time_elapsed)
+
+        self._automodes._on_iteration = read_then_iterate
+
+    def log_loop(self) -> None:
+        """Records this loop to the DataLog"""
+        # created here, since the components must be set up first
+        if self.match_log is None:
+            self.match_log = datalog.MatchLog(self.datalog, self)
+        try:
+            self.match_log.log()
+        except:
+            self.onException()
+
+    def _enabled_periodic(self) -> None:
+        """Runs the components in three phases so that no component acts
+        on stale sensor data or has its output delayed a loop because of
+        the order the components are declared in:
+        1. read -- every component polls its sensors (`read()`)
+        2. compute -- every component runs its logic (`execute()`)
+        3. write -- every component sends its outputs (`flush()`)
+        The read phase runs at the start of the loop, before operator
+        input (`teleopPeriodic()`) or the autonomous mode, so that they
+        act on this loop's sensor values too. The other phases run here.
+        Background work (`scheduler`) and garbage collection run at the
+        end, in the time the loop has to spare.
+        """
+        watchdog = self.watchdog
+        frame_start = self.frame_start
+
+        for name, component in self._components:
+            try:
+                component.execute()
+            except:
+                self.onException()
+            watchdog.addEpoch(name)
+
+        for name, component in self._components:
+            flush = getattr(component, "flush", None)
+            if flush is not None:
+                try:
+                    flush()
+                except:
+                    self.onException()
+        self.input_latency.record_outputs()
+        watchdog.addEpoch("flush")
+
+        self.log_loop()
+        watchdog.addEpoch("log")
+
+        # what magicbot's _do_periodics() runs besides the feedbacks:
+        # robotPeriodic() and, in simulation, the physics. These must
+        # step every loop.
+        for periodic, name in self._MagicRobot__periodics:
+            periodic()
+            watchdog.addEpoch(name)
+
+        self.scheduler.run(frame_start + self.control_loop_wait_time)
+        watchdog.addEpoch("scheduler")
+
+        for reset_dict, component in self._reset_components:
+            component.__dict__.update(reset_dict)
+
+        slack = self.control_loop_wait_time - (
+            wpilib.Timer.getFPGATimestamp() - frame_start
+        )
+        self.gc_control.tick(slack, self.trace_allocations)
+        watchdog.addEpoch("gc")
+
+    def refresh_tunables(self) -> None:
+        self.intake.refresh_tunables()
+        self.climber.refresh_tunables()
+
+    def update_feedbacks(self) -> None:
+        """Publishes the `@feedback` values, as magicbot's
+        `_do_periodics()` does
+        """
+        for method, entry in self._feedbacks:
+            try:
+                value = method()
+            except:
+                self.onException()
+            else:
+                entry.setValue(value)
 
     def disabledInit(self) -> None:
         self.drivetrain.set_coast()
+        self.gc_control.on_disable()
+        if self.characterization is not None:
+            self.characterization.stop()
+            print(f"SysId data saved to {self.characterization.save()}")
+            self.characterization = None
+
+    def disabledPeriodic(self) -> None:
+        self.read_sensors()
+        self.log_loop()
+        # load what the chosen autonomous mode needs before it runs
+        mode = self._automodes.chooser.getSelected()
+        prefetch = getattr(mode, "prefetch", None)
+        if prefetch is not None:
+            prefetch()
+        self.scheduler.run(
+            self.frame_start + self.control_loop_wait_time, enabled=False
+        )
+
+    def check_health(self) -> None:
+        """Publishes the state of the battery and the CAN bus"""
+        can = wpilib.RobotController.getCANStatus()
+        dashboard = wpilib.SmartDashboard
+        dashboard.putNumber(
+            "Health/Battery Voltage", wpilib.RobotController.getBatteryVoltage()
+        )
+        dashboard.putBoolean(
+            "Health/Browned Out", wpilib.RobotController.isBrownedOut()
+        )
+        dashboard.putNumber("Health/CAN Utilization", can.percentBusUtilization)
+        dashboard.putNumber("Health/CAN Bus Off", can.busOffCount)
+        dashboard.putNumber("Health/CAN Transmit Full", can.txFullCount)
+
+    def testInit(self) -> None:
+        """Runs the characterization test chosen on the dashboard until
+        the robot is disabled
+        """
+        mechanism = sysid.MECHANISMS[self.sysid_mechanism_chooser.getSelected()]
+        self.characterization = sysid.Characterization(
+            mechanism(self), self.sysid_test_chooser.getSelected()
+        )
+        self.characterization.start()
 
     def autonomousInit(self):
         self.gyro.reset()
+        self.gc_control.on_enable()
 
-    def teleopPeriodic(self):
-        self.intake.update_position()
+    def teleopInit(self):
+        self.oi.reset()
+        self.gc_control.on_enable()
 
+    def teleopPeriodic(self):
+        self.read_sensors()
         with self.consumeExceptions():
+            self.oi.update()
+            self.input_latency.record_inputs()
             if abs(self.intake.get_joint_setpoint() - self.intake.lower_limit) < 0.001:
                 self.drive_control.arcade_drive(
                     self.drive_curve(self.oi.drive_forward()),
@@ -156,7 +400,10 @@ class MyRobot(MagicRobot):
                 self.intake_control.request_eject()
                 self.intake_control.request_down()
                 self.shooter_control.request_eject()
-            if self.shooter_control.current_state == "idle":
+            if self.handoff.shooter_state in (
+                ShooterState.IDLE,
+                ShooterState.PRESPINNING,
+            ):
                 if not self.oi.intake_down():  # self.oi.intake_up()
                     self.intake_control.request_up()
                 if self.oi.intake_down():
@@ -164,7 +411,7 @@ class MyRobot(MagicRobot):
 
     @feedback
     def get_angle(self) -> float:
-        return self.gyro.getAngle()
+        return self.drivetrain.get_angle()
 
 
 if __name__ == "__main__":
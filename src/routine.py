@@ -0,0 +1,384 @@
+"""Compiles autonomous routines described in data files into magicbot
+autonomous modes.
+
+A routine is a JSON file with a `name` (the mode name shown on the
+dashboard) and a list of `steps`, each of which has an `action` and the
+parameters listed below. The steps run one after another and the robot
+stops once the last step finishes.
+
+shoot -- find a tag, align to it, then shoot
+    duration -- time given to the shooter (s)
+    stow_intake -- raise the intake while looking for the tag
+face_note -- turn to face a note, using a tag to locate the robot
+    note -- field position of the note relative to the tag (m)
+intake -- lower the intake and intake while driving
+    duration -- time spent intaking (s)
+    drive_speed -- forward value passed to `arcade_drive()`
+    drive_start, drive_end -- window in which to drive (s)
+drive -- drive straight
+    duration -- time spent driving (s)
+    speed -- forward value passed to `arcade_drive()`
+wait -- stay still
+    duration -- time spent waiting (s)
+follow -- follow a trajectory (see `trajectories`), starting from
+    wherever the robot is when the step starts
+    waypoints -- list of [x, y, heading] (m, m, degrees) relative to
+        the starting pose
+    max_velocity, max_acceleration -- (m/s, m/s^2)
+    reversed -- drive backwards
+deploy_intake -- lower the intake
+spin_up -- spin up the shooter flywheels (never finishes on its own)
+parallel -- run several of the actions above at once
+    actions -- list of actions, each of which may also set
+        `background` so that it is not waited on
+    join -- "all" to finish once every action has finished (default)
+        or "any" to finish once one of them has
+    timeout -- time after which to move on regardless (s)
+
+face_note, intake, drive, follow, wait, deploy_intake and spin_up can be run in
+parallel. The shooter keeps spinning from a `spin_up` into the next
+`shoot`, which then fires without waiting for the flywheels.
+"""
+
+import json
+import math
+import os
+
+from magicbot.state_machine import state, timed_state
+from wpimath.controller import RamseteController
+
+from components.drivetrain import Drivetrain
+from components.drive_control import DriveControl
+from components.intake import Intake
+from components.intake_control import IntakeControl
+from components.shooter_control import ShooterControl
+from components.vision import Vision
+from tracing import TracedAutonomousStateMachine
+import trajectories
+import util
+
+
+class Routine(TracedAutonomousStateMachine):
+    """Base class of compiled routines. Declares every component an
+    action may use so that they are injected.
+    """
+
+    drive_control: DriveControl
+    intake_control: IntakeControl
+    shooter_control: ShooterControl
+    drivetrain: Drivetrain
+    intake: Intake
+    vision: Vision
+
+    steps = []
+    prefetched = False
+
+    def prefetch(self) -> None:
+        """Starts loading the trajectories this routine follows on a
+        background thread
+        """
+        if self.prefetched:
+            return
+        for params in trajectories.find_params(self.steps):
+            trajectories.prefetch(params)
+        self.prefetched = True
+
+
+def _named(f, name: str):
+    """States are named after their functions, so rename `f`"""
+    f.__name__ = name
+    f.__qualname__ = name
+    return f
+
+
+def compile_shoot(n: int, step: dict, next_state: str) -> list:
+    finding_tag = f"finding_tag{n}"
+    aligning = f"aligning{n}"
+    shooting = f"shooting{n}"
+    fired_attr = f"shooting{n}_fired"
+    stow_intake = step.get("stow_intake", False)
+
+    def finding(self):
+        if stow_intake:
+            self.intake_control.engage()
+            self.intake_control.request_up()
+        # the flywheels keep spinning (from a `spin_up` too) until the
+        # shot, since nothing else asks for a prespin while the robot is
+        # not aligning
+        self.shooter_control.engage()
+        self.shooter_control.request_prespin()
+        self.drivetrain.arcade_drive(0, 0)
+        if self.vision.hasTargets():
+            self.next_state(aligning)
+
+    def align(self, state_tm):
+        self.shooter_control.engage()
+        self.shooter_control.request_prespin()
+        self.drive_control.engage()
+        self.drive_control.request_align()
+        if not self.vision.hasTargets():
+            self.next_state(finding_tag)
+            return
+        if self.drive_control.current_state == "settling" and state_tm > 0.5:
+            self.next_state(shooting)
+
+    def shoot(self, initial_call):
+        self.drivetrain.arcade_drive(0, 0)
+        # starts from `loading` if the shooter is not already executing,
+        # otherwise the request fires it (from `prespinning` if spun up)
+        self.shooter_control.engage(initial_state="loading")
+        if initial_call:
+            setattr(self, fired_attr, False)
+        if self.shooter_control.current_state in ("loading", "preshooting", "shooting"):
+            setattr(self, fired_attr, True)
+        # requested until the shooter takes it, since a request made
+        # while it is staging, intaking or ejecting is ignored
+        if not getattr(self, fired_attr):
+            self.shooter_control.request_shoot()
+
+    return [
+        state(_named(finding, finding_tag)),
+        state(_named(align, aligning)),
+        timed_state(duration=step["duration"], next_state=next_state)(
+            _named(shoot, shooting)
+        ),
+    ]
+
+
+def task_face_note(key: str, step: dict):
+    heading_attr = f"{key}_heading"
+    note_x, note_y = step["note"]
+
+    def face_note(self, state_tm, initial_call) -> bool:
+        if initial_call:
+            setattr(self, heading_attr, None)
+        if not self.vision.hasTargets():
+            return False
+        # let the vision filters settle before locating the robot
+        if state_tm < 0.5:
+            return False
+        if getattr(self, heading_attr) is None:
+            x, y = util.rotate_vector(
+                self.vision.getX() + self.vision.getCameraOffset(),
+                self.vision.getY(),
+                math.radians(self.drivetrain.get_angle()),
+            )
+            heading = -math.degrees(math.atan2(note_y - y, note_x - x))
+            setattr(self, heading_attr, heading)
+            self.drive_control.set_angle(heading)
+        self.drive_control.engage()
+        self.drive_control.request_turn()
+        return self.drive_control.current_state == "settling"
+
+    return face_note
+
+
+def task_intake(key: str, step: dict):
+    drive_speed = step.get("drive_speed", 0)
+    drive_start = step.get("drive_start", 0)
+    drive_end = step.get("drive_end", step["duration"])
+
+    def intake(self, state_tm, initial_call) -> bool:
+        self.intake_control.engage()
+        self.intake_control.request_down()
+        self.intake_control.request_intake()
+        if drive_start < state_tm < drive_end:
+            self.drivetrain.arcade_drive(drive_speed, 0)
+        return state_tm >= step["duration"]
+
+    return intake
+
+
+def task_drive(key: str, step: dict):
+    def drive(self, state_tm, initial_call) -> bool:
+        if state_tm >= step["duration"]:
+            return True
+        self.drivetrain.arcade_drive(step["speed"], 0)
+        return False
+
+    return drive
+
+
+def task_follow(key: str, step: dict):
+    start_attr = f"{key}_start"
+    trajectory_attr = f"{key}_trajectory"
+    controller = RamseteController()
+
+    def follow(self, state_tm, initial_call) -> bool:
+        if initial_call:
+            setattr(self, start_attr, self.drivetrain.get_pose())
+            # normally loaded already by `prefetch()`
+            setattr(self, trajectory_attr, trajectories.prefetch(step).result())
+        trajectory = getattr(self, trajectory_attr)
+        if state_tm >= trajectory.totalTime():
+            return True
+        pose = self.drivetrain.get_pose().relativeTo(getattr(self, start_attr))
+        self.drivetrain.follow(controller.calculate(pose, trajectory.sample(state_tm)))
+        return False
+
+    return follow
+
+
+def task_wait(key: str, step: dict):
+    def wait(self, state_tm, initial_call) -> bool:
+        return state_tm >= step["duration"]
+
+    return wait
+
+
+def task_deploy_intake(key: str, step: dict):
+    def deploy_intake(self, state_tm, initial_call) -> bool:
+        self.intake_control.engage()
+        self.intake_control.request_down()
+        return self.intake_control.current_state == "ready"
+
+    return deploy_intake
+
+
+def task_spin_up(key: str, step: dict):
+    def spin_up(self, state_tm, initial_call) -> bool:
+        self.shooter_control.engage()
+        self.shooter_control.request_prespin()
+        return False
+
+    return spin_up
+
+
+# Tasks are single actions run one tick at a time. Each returns `True`
+# once it has finished, after which it is no longer run.
+tasks = {
+    "face_note": task_face_note,
+    "intake": task_intake,
+    "drive": task_drive,
+    "follow": task_follow,
+    "wait": task_wait,
+    "deploy_intake": task_deploy_intake,
+    "spin_up": task_spin_up,
+}
+
+
+def compile_task(name: str, task, next_state: str) -> list:
+    def run(self, state_tm, initial_call):
+        if task(self, state_tm, initial_call):
+            self.next_state(next_state)
+
+    return [state(_named(run, name))]
+
+
+def compile_face_note(n: int, step: dict, next_state: str) -> list:
+    name = f"facing_note{n}"
+    return compile_task(name, task_face_note(name, step), next_state)
+
+
+def compile_follow(n: int, step: dict, next_state: str) -> list:
+    name = f"following{n}"
+    return compile_task(name, task_follow(name, step), next_state)
+
+
+def compile_deploy_intake(n: int, step: dict, next_state: str) -> list:
+    name = f"deploying_intake{n}"
+    return compile_task(name, task_deploy_intake(name, step), next_state)
+
+
+def compile_parallel(n: int, step: dict, next_state: str) -> list:
+    name = f"parallel{n}"
+    done_attr = f"{name}_done"
+    branches = []
+    for i, action in enumerate(step["actions"]):
+        if action["action"] not in tasks:
+            raise ValueError(f"Action cannot be run in parallel: {action['action']}")
+        task = tasks[action["action"]](f"{name}_{i}", action)
+        branches.append((task, action.get("background", False)))
+    join = any if step.get("join", "all") == "any" else all
+    timeout = step.get("timeout")
+
+    def parallel(self, state_tm, initial_call):
+        if initial_call:
+            setattr(self, done_attr, [False] * len(branches))
+        done = getattr(self, done_attr)
+        for i, (task, background) in enumerate(branches):
+            if not done[i]:
+                done[i] = task(self, state_tm, initial_call)
+        if join(
+            finished
+            for finished, (task, background) in zip(done, branches)
+            if not background
+        ) or (timeout is not None and state_tm > timeout):
+            self.next_state(next_state)
+
+    return [state(_named(parallel, name))]
+
+
+def compile_timed(name: str, task, duration: float, next_state: str) -> list:
+    """Runs `task` as a timed state, so that its duration is tunable"""
+
+    def run(self, state_tm, initial_call):
+        task(self, state_tm, initial_call)
+
+    return [timed_state(duration=duration, next_state=next_state)(_named(run, name))]
+
+
+def compile_intake(n: int, step: dict, next_state: str) -> list:
+    name = f"intaking{n}"
+    return compile_timed(name, task_intake(name, step), step["duration"], next_state)
+
+
+def compile_drive(n: int, step: dict, next_state: str) -> list:
+    name = f"driving{n}"
+    return compile_timed(name, task_drive(name, step), step["duration"], next_state)
+
+
+def compile_wait(n: int, step: dict, next_state: str) -> list:
+    name = f"waiting{n}"
+    return compile_timed(name, task_wait(name, step), step["duration"], next_state)
+
+
+compilers = {
+    "shoot": compile_shoot,
+    "face_note": compile_face_note,
+    "intake": compile_intake,
+    "drive": compile_drive,
+    "follow": compile_follow,
+    "wait": compile_wait,
+    "deploy_intake": compile_deploy_intake,
+    "parallel": compile_parallel,
+}
+
+
+def compile_routine(description: dict) -> type:
+    """Returns an autonomous mode class that runs `description`"""
+
+    def stopped(self):
+        self.drivetrain.arcade_drive(0, 0)
+
+    steps = description["steps"]
+    # compile backwards so each step knows the name of the state after it
+    states = [state(_named(stopped, "stopped"))]
+    for n in range(len(steps), 0, -1):
+        step = steps[n - 1]
+        if step["action"] not in compilers:
+            raise ValueError(f"Unknown action in routine: {step['action']}")
+        states = compilers[step["action"]](n, step, states[0].name) + states
+    states[0].first = True
+
+    namespace = {s.name: s for s in states}
+    namespace["MODE_NAME"] = description["name"]
+    namespace["steps"] = steps
+    namespace["__module__"] = __name__
+    class_name = "".join(
+        "".join(c for c in word if c.isalnum()).capitalize()
+        for word in description["name"].split()
+    )
+    return type(class_name, (Routine,), namespace)
+
+
+def load_routines(directory: str) -> list[type]:
+    """Compiles every routine (`.json` file) in `directory`"""
+    routines = []
+    if not os.path.isdir(directory):
+        return routines
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".json"):
+            with open(os.path.join(directory, filename)) as f:
+                routines.append(compile_routine(json.load(f)))
+    return routines
@@ -0,0 +1,111 @@
+"""Runs low-rate background work (telemetry, dashboard feedback, tunable
+refresh, health checks) in the time the control loop leaves over, so
+that the work can grow without making the loop overrun.
+
+Each task is added with a rate and a priority. Once the control phase of
+a loop is done, `run()` runs the tasks that are due, highest priority
+first, as long as each is expected to finish before the deadline it is
+given. A task that does not fit is deferred to the next loop. Once it
+has been deferred for a whole period, that run is dropped, so a task
+never runs in a burst to catch up. A task's expected duration is the
+longest it has recently taken.
+
+How often each task has run, been deferred and been dropped is published
+to NetworkTables under `/scheduler/<task>`.
+"""
+
+import time
+
+import wpilib
+from ntcore import NetworkTableInstance
+
+# time kept free before the deadline for the rest of the loop (s)
+MARGIN = 0.002
+# rate at which a task's expected duration decays towards how long it
+# takes now
+DECAY = 0.95
+
+
+class Task:
+    def __init__(self, name: str, function, rate: float, priority: int, disabled: bool):
+        self.name = name
+        self.function = function
+        self.period = 1 / rate
+        self.priority = priority
+        self.disabled = disabled
+        self.next_run = 0.0
+        self.expected_duration = 0.0
+        self.runs = 0
+        self.deferred = 0
+        self.dropped = 0
+
+        table = (
+            NetworkTableInstance.getDefault().getTable("scheduler").getSubTable(name)
+        )
+        # [runs, deferred, dropped]
+        self.counts_pub = table.getIntegerArrayTopic("counts").publish()
+        self.duration_pub = table.getDoubleTopic("expected_duration").publish()
+
+    def publish(self) -> None:
+        self.counts_pub.set([self.runs, self.deferred, self.dropped])
+        self.duration_pub.set(self.expected_duration)
+
+
+class Scheduler:
+    def __init__(self, on_exception=None):
+        """on_exception -- called when a task raises, as the robot's
+        `onException()`. Exceptions are raised if it is `None`.
+        """
+        self.tasks = []
+        self.on_exception = on_exception
+
+    def add(
+        self,
+        name: str,
+        function,
+        rate: float,
+        priority: int = 0,
+        disabled: bool = True,
+    ) -> Task:
+        """Runs `function` `rate` times a second. Tasks with higher
+        `priority` run first. Unless `disabled` is set, the task is not
+        run while the robot is disabled.
+        """
+        task = Task(name, function, rate, priority, disabled)
+        self.tasks.append(task)
+        # sorted once here rather than on every run
+        self.tasks.sort(key=lambda task: task.priority, reverse=True)
+        return task
+
+    def run(self, deadline: float, enabled: bool = True) -> None:
+        """Runs the tasks that are due and fit before `deadline` (FPGA
+        time, s)
+        """
+        for task in self.tasks:
+            now = wpilib.Timer.getFPGATimestamp()
+            if now < task.next_run or not (enabled or task.disabled):
+                continue
+            if now + task.expected_duration + MARGIN > deadline:
+                if now - task.next_run >= task.period:
+                    task.dropped += 1
+                    task.next_run += task.period
+                else:
+                    task.deferred += 1
+                continue
+            start = time.perf_counter()
+            try:
+                task.function()
+            except:
+                if self.on_exception is None:
+                    raise
+                self.on_exception()
+            duration = time.perf_counter() - start
+            task.expected_duration = max(duration, task.expected_duration * DECAY)
+            task.runs += 1
+            task.next_run += task.period
+            if task.next_run <= now:
+                task.next_run = now + task.period
+
+    def publish(self) -> None:
+        for task in self.tasks:
+            task.publish()
@@ -0,0 +1,72 @@
+"""Recording of the CAN frames sent to simulated motor controllers, so
+that tests can check how much traffic the robot code generates and when
+commands go out
+"""
+
+import collections
+import typing
+
+import wpilib
+
+# kinds of frame
+COMMAND = "command"
+CONFIG = "config"
+# frames kept, so that a long simulation does not grow the log without
+# bound
+MAX_FRAMES = 200_000
+
+
+class Frame(typing.NamedTuple):
+    time: float
+    device: str
+    kind: str
+    name: str
+    value: typing.Any
+
+
+class FrameLog:
+    """Frames sent to every simulated motor controller, in the order they
+    were sent. Each frame is timestamped with the FPGA time. Only the
+    last `MAX_FRAMES` are kept. The robot clears the log when it is
+    created, so each robot sees only its own frames.
+    """
+
+    frames: collections.deque[Frame] = collections.deque(maxlen=MAX_FRAMES)
+
+    @classmethod
+    def record(cls, device: str, kind: str, name: str, value=None) -> None:
+        cls.frames.append(
+            Frame(wpilib.Timer.getFPGATimestamp(), device, kind, name, value)
+        )
+
+    @classmethod
+    def clear(cls) -> None:
+        cls.frames.clear()
+
+    @classmethod
+    def get_frames(
+        cls, device: str | None = None, kind: str | None = None
+    ) -> list[Frame]:
+        """Returns the frames sent to `device` (or every device) of
+        `kind` (or every kind)
+        """
+        return [
+            frame
+            for frame in cls.frames
+            if (device is None or frame.device == device)
+            and (kind is None or frame.kind == kind)
+        ]
+
+    @classmethod
+    def count(cls, device: str | None = None, kind: str | None = None) -> int:
+        return len(cls.get_frames(device, kind))
+
+    @classmethod
+    def first_command_after(cls, device: str, time: float) -> Frame | None:
+        """Returns the first command sent to `device` at or after `time`,
+        for measuring how long a command takes to go out
+        """
+        for frame in cls.frames:
+            if frame.device == device and frame.kind == COMMAND and frame.time >= time:
+                return frame
+        return None
@@ -0,0 +1,57 @@
+"""Deterministic stepping of the simulated robot. The HAL clock is paused
+and only advanced here, in fixed steps, so everything that runs off it
+(the robot loop, magicbot `timed_state`s, `Notifier`s, `wpilib.Timer`)
+runs as fast as the code allows and the same way every time.
+"""
+
+import random
+
+import numpy as np
+from wpilib.simulation import (
+    DriverStationSim,
+    isTimingPaused,
+    pauseTiming,
+    stepTiming,
+)
+
+
+class SimClock:
+    """Steps simulated time by `timestep` seconds at a time, waiting each
+    step for the robot loop and every `Notifier` due to run. A driver
+    station packet is sent every `packet_period` seconds, as from a real
+    driver station. `seed` seeds `random` and NumPy's global generator.
+    """
+
+    def __init__(
+        self, timestep: float = 0.02, packet_period: float = 0.02, seed: int = 0
+    ):
+        self.timestep = timestep
+        self.packet_period = packet_period
+        self.since_packet = packet_period
+        random.seed(seed)
+        np.random.seed(seed)
+        if not isTimingPaused():
+            pauseTiming()
+
+    def step(self, seconds: float, enabled: bool, autonomous: bool = True) -> None:
+        """Steps `seconds` of simulated time with the robot enabled or
+        disabled in autonomous or teleop
+        """
+        DriverStationSim.setDsAttached(True)
+        DriverStationSim.setAutonomous(autonomous)
+        DriverStationSim.setEnabled(enabled)
+        # sends the new mode right away
+        self.since_packet = self.packet_period
+        # counted in steps so that rounding does not add or drop a step
+        for _ in range(round(seconds / self.timestep)):
+            if self.since_packet >= self.packet_period - 1e-9:
+                DriverStationSim.notifyNewData()
+                self.since_packet = 0.0
+            stepTiming(self.timestep)
+            self.since_packet += self.timestep
+
+    def run_match(self, autonomous: float = 15.0, teleop: float = 135.0) -> None:
+        """Steps through a match: autonomous, then teleop, then disabled"""
+        self.step(autonomous, enabled=True, autonomous=True)
+        self.step(teleop, enabled=True, autonomous=False)
+        self.step(self.timestep, enabled=False, autonomous=False)
@@ -0,0 +1,45 @@
+import wpilib
+from phoenix6.controls.voltage_out import VoltageOut
+from phoenix6.signals import NeutralModeValue
+
+from sim.can import COMMAND, CONFIG, FrameLog
+import util
+
+
+class SimTalonFX(util.WPI_TalonFX):
+    """`util.WPI_TalonFX` used in simulation that records every command
+    and config frame sent to it in `FrameLog`. The velocity status
+    signal is the rotor velocity that `physics.py` sets through
+    `sim_state`.
+    """
+
+    def __init__(self, device_id: int, canbus: str = "", enable_foc: bool = False):
+        super().__init__(device_id, canbus=canbus, enable_foc=enable_foc)
+        self.device = f"Talon FX [{device_id}]"
+        self.request = self.duty_cycle_out
+
+    def set_control(self, request):
+        FrameLog.record(
+            self.device,
+            COMMAND,
+            type(request).__name__,
+            getattr(request, "output", None),
+        )
+        self.request = request
+        return super().set_control(request)
+
+    def setIdleMode(self, mode: NeutralModeValue):
+        FrameLog.record(self.device, CONFIG, "neutral_mode", mode)
+        super().setIdleMode(mode)
+
+    def setInverted(self, isInverted: bool):
+        FrameLog.record(self.device, CONFIG, "inverted", isInverted)
+        super().setInverted(isInverted)
+
+    def get_applied_output(self) -> float:
+        """Returns the output last commanded, as a fraction of the supply
+        voltage
+        """
+        if isinstance(self.request, VoltageOut):
+            return self.request.output / wpilib.RobotController.getBatteryVoltage()
+        return self.request.output
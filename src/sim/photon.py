@@ -0,0 +1,142 @@
+"""Stand-in for a PhotonVision coprocessor, which sees the AprilTags of
+the field layout from the simulated robot pose
+"""
+
+import collections
+import math
+import random
+import typing
+
+import wpilib
+from photonlibpy.photonPipelineResult import PhotonPipelineResult
+from photonlibpy.photonTrackedTarget import PhotonTrackedTarget
+from robotpy_apriltag import AprilTagField, AprilTagFieldLayout
+from wpimath.geometry import (
+    Pose2d,
+    Pose3d,
+    Rotation3d,
+    Transform3d,
+    Translation3d,
+)
+
+if typing.TYPE_CHECKING:
+    from components.vision import SmartCamera
+
+# height of the cameras above the floor (m), which `SmartCamera.rc`
+# leaves out
+CAMERA_HEIGHT = 0.25
+
+
+class SimCamera:
+    """Replaces `getLatestResult()` of a `SmartCamera` with one that
+    returns the tags the camera would see from the pose given by
+    `get_pose`. Frames are captured `fps` times a second and published
+    `latency` seconds after they are captured. Each frame is dropped with
+    chance `dropout_rate`. Tag translations get gaussian noise with a
+    standard deviation of `noise` per meter of distance, and ambiguity
+    grows with distance at `ambiguity` per meter.
+    """
+
+    def __init__(
+        self,
+        camera: "SmartCamera",
+        get_pose: typing.Callable[[], Pose2d],
+        layout: AprilTagFieldLayout | None = None,
+        fps: float = 30.0,
+        latency: float = 0.03,
+        dropout_rate: float = 0.0,
+        noise: float = 0.0,
+        ambiguity: float = 0.03,
+        horizontal_fov: float = 70.0,
+        vertical_fov: float = 50.0,
+        max_distance: float = 6.0,
+        seed: int = 0,
+    ):
+        if layout is None:
+            layout = AprilTagFieldLayout.loadField(AprilTagField.k2024Crescendo)
+        self.tags = layout.getTags()
+        self.get_pose = get_pose
+        # `SmartCamera` turns camera coordinates into robot coordinates
+        # by pitching them up by `tilt`
+        self.robot_to_camera = Transform3d(
+            Translation3d(camera.rc[0], camera.rc[1], CAMERA_HEIGHT),
+            Rotation3d(0, -math.radians(camera.tilt), 0),
+        )
+        self.period = 1 / fps
+        self.latency = latency
+        self.dropout_rate = dropout_rate
+        self.noise = noise
+        self.ambiguity = ambiguity
+        self.half_yaw = math.radians(horizontal_fov) / 2
+        self.half_pitch = math.radians(vertical_fov) / 2
+        self.max_distance = max_distance
+        self.rng = random.Random(seed)
+        self.next_capture = 0.0
+        self.pending = collections.deque()
+        self.result = PhotonPipelineResult()
+
+    def __call__(self) -> PhotonPipelineResult:
+        now = wpilib.Timer.getFPGATimestamp()
+        while self.next_capture <= now:
+            if self.rng.random() >= self.dropout_rate:
+                self.pending.append((self.next_capture, self.capture()))
+            self.next_capture += self.period
+        while self.pending and self.pending[0][0] + self.latency <= now:
+            captured, targets = self.pending.popleft()
+            self.result = PhotonPipelineResult(
+                latencyMillis=self.latency * 1000,
+                timestampSec=captured,
+                targets=targets,
+            )
+        return self.result
+
+    def capture(self) -> list[PhotonTrackedTarget]:
+        """Returns the tags in view from the current pose"""
+        camera_pose = Pose3d(self.get_pose()).transformBy(self.robot_to_camera)
+        targets = []
+        for tag in self.tags:
+            # tags are only visible from the front
+            facing = Translation3d(1, 0, 0).rotateBy(tag.pose.rotation())
+            to_camera = camera_pose.translation() - tag.pose.translation()
+            if (
+                facing.X() * to_camera.X()
+                + facing.Y() * to_camera.Y()
+                + facing.Z() * to_camera.Z()
+                <= 0
+            ):
+                continue
+            transform = Transform3d(camera_pose, tag.pose)
+            x, y, z = transform.X(), transform.Y(), transform.Z()
+            distance = math.sqrt(x * x + y * y + z * z)
+            yaw = math.atan2(y, x)
+            pitch = math.atan2(z, math.hypot(x, y))
+            if (
+                x <= 0
+                or distance > self.max_distance
+                or abs(yaw) > self.half_yaw
+                or abs(pitch) > self.half_pitch
+            ):
+                continue
+            if self.noise:
+                sigma = self.noise * distance
+                transform = Transform3d(
+                    Translation3d(
+                        x + self.rng.gauss(0, sigma),
+                        y + self.rng.gauss(0, sigma),
+                        z + self.rng.gauss(0, sigma),
+                    ),
+                    transform.rotation(),
+                )
+            targets.append(
+                PhotonTrackedTarget(
+                    # PhotonVision yaw is positive to the right
+                    yaw=-math.degrees(yaw),
+                    pitch=math.degrees(pitch),
+                    area=min(100.0, 1.0 / (distance * distance)),
+                    fiducialId=tag.ID,
+                    bestCameraToTarget=transform,
+                    altCameraToTarget=transform,
+                    poseAmbiguity=min(1.0, self.ambiguity * distance),
+                )
+            )
+        return targets
@@ -1,2 +1,240 @@
-class SimSparkMax:
-    pass
+import wpilib
+from wpimath.trajectory import TrapezoidProfile
+from rev import CANSparkBase, CANSparkMax
+
+from sim.can import COMMAND, CONFIG, FrameLog
+
+SIMULATED_CONTROL_TYPES = (
+    CANSparkBase.ControlType.kDutyCycle,
+    CANSparkBase.ControlType.kVoltage,
+    CANSparkBase.ControlType.kPosition,
+    CANSparkBase.ControlType.kVelocity,
+    CANSparkBase.ControlType.kSmartMotion,
+)
+
+
+class SimRelativeEncoder:
+    """Wraps the encoder of a `SimSparkMax`, recording the frames sent to
+    set its position and conversion factors. Position and velocity are
+    those of the Spark Max's sim device, which `physics.py` sets.
+    """
+
+    def __init__(self, encoder, device: str):
+        self.encoder = encoder
+        self.device = device
+
+    def getPosition(self) -> float:
+        return self.encoder.getPosition()
+
+    def getVelocity(self) -> float:
+        return self.encoder.getVelocity()
+
+    def setPosition(self, position: float):
+        FrameLog.record(self.device, COMMAND, "position", position)
+        return self.encoder.setPosition(position)
+
+    def setPositionConversionFactor(self, factor: float):
+        FrameLog.record(self.device, CONFIG, "position_conversion_factor", factor)
+        return self.encoder.setPositionConversionFactor(factor)
+
+    def setVelocityConversionFactor(self, factor: float):
+        FrameLog.record(self.device, CONFIG, "velocity_conversion_factor", factor)
+        return self.encoder.setVelocityConversionFactor(factor)
+
+    def getPositionConversionFactor(self) -> float:
+        return self.encoder.getPositionConversionFactor()
+
+    def getVelocityConversionFactor(self) -> float:
+        return self.encoder.getVelocityConversionFactor()
+
+
+class SimSparkPIDController:
+    """Stands in for the onboard PID controller of a `SimSparkMax`, which
+    the simulator does not run. Position and velocity control with P and
+    feedforward gains, duty cycle and voltage are simulated;
+    `SimSparkMax.get()` computes the output. Smart Motion follows a
+    trapezoidal profile to the reference with velocity control, as the
+    Spark Max does. References of other control types are recorded, and
+    the output is left as it was.
+    """
+
+    def __init__(self, device: str):
+        self.device = device
+        self.kP = 0.0
+        self.kFF = 0.0
+        self.min_output = -1.0
+        self.max_output = 1.0
+        self.reference = None
+        self.ctrl = None
+        # Smart Motion constraints (RPM, RPM/s), and the profile's state
+        # (rotations, rotations/s) at `profile_time`
+        self.max_velocity = 0.0
+        self.max_acceleration = 0.0
+        self.profile_state = None
+        self.profile_time = 0.0
+
+    def setP(self, gain: float, slotID: int = 0):
+        FrameLog.record(self.device, CONFIG, "p", gain)
+        self.kP = gain
+
+    def setFF(self, gain: float, slotID: int = 0):
+        FrameLog.record(self.device, CONFIG, "ff", gain)
+        self.kFF = gain
+
+    def setSmartMotionMaxVelocity(self, maxVel: float, slotID: int = 0):
+        FrameLog.record(self.device, CONFIG, "smart_motion_max_velocity", maxVel)
+        self.max_velocity = maxVel
+
+    def setSmartMotionMaxAccel(self, maxAccel: float, slotID: int = 0):
+        FrameLog.record(self.device, CONFIG, "smart_motion_max_accel", maxAccel)
+        self.max_acceleration = maxAccel
+
+    def setSmartMotionAllowedClosedLoopError(self, allowedErr: float, slotID: int = 0):
+        FrameLog.record(self.device, CONFIG, "smart_motion_allowed_error", allowedErr)
+
+    def setOutputRange(self, min: float, max: float, slotID: int = 0):
+        FrameLog.record(self.device, CONFIG, "output_range", (min, max))
+        self.min_output = min
+        self.max_output = max
+
+    def setReference(self, value: float, ctrl: CANSparkBase.ControlType, *args):
+        FrameLog.record(self.device, COMMAND, "reference", (value, ctrl))
+        if ctrl not in SIMULATED_CONTROL_TYPES:
+            return
+        if self.reference is None or ctrl != self.ctrl:
+            # a new profile starts from wherever the motor is
+            self.profile_state = None
+        self.reference = value
+        self.ctrl = ctrl
+
+    def get_output(self, position: float, velocity: float) -> float:
+        """Returns the output for the reference, given the encoder's
+        `position` and `velocity`
+        """
+        ControlType = CANSparkBase.ControlType
+        if self.ctrl == ControlType.kDutyCycle:
+            return self.reference
+        if self.ctrl == ControlType.kVoltage:
+            return self.reference / wpilib.RobotController.getBatteryVoltage()
+        if self.ctrl == ControlType.kPosition:
+            output = self.kFF * self.reference + self.kP * (self.reference - position)
+        else:
+            reference = self.reference
+            if self.ctrl == ControlType.kSmartMotion:
+                reference = self.get_profile_velocity(position, velocity)
+            output = self.kFF * reference + self.kP * (reference - velocity)
+        return min(max(output, self.min_output), self.max_output)
+
+    def get_profile_velocity(self, position: float, velocity: float) -> float:
+        """Steps the Smart Motion profile to now, returning its velocity
+        (RPM)
+        """
+        now = wpilib.Timer.getFPGATimestamp()
+        if self.profile_state is None:
+            self.profile_state = TrapezoidProfile.State(position, velocity / 60)
+        else:
+            profile = TrapezoidProfile(
+                TrapezoidProfile.Constraints(
+                    self.max_velocity / 60, self.max_acceleration / 60
+                )
+            )
+            self.profile_state = profile.calculate(
+                now - self.profile_time,
+                self.profile_state,
+                TrapezoidProfile.State(self.reference, 0),
+            )
+        self.profile_time = now
+        return self.profile_state.velocity * 60
+
+
+class SimSparkMax(CANSparkMax):
+    """CANSparkMax used in simulation that records every command and
+    config frame sent to it in `FrameLog`. Output, idle mode and
+    inversion are kept here so that they can be read back without
+    hardware.
+    """
+
+    def __init__(self, device_id: int, motor_type: CANSparkMax.MotorType):
+        super().__init__(device_id, motor_type)
+        self.device = f"SPARK MAX [{device_id}]"
+        self.output = 0.0
+        self.idle_mode = CANSparkBase.IdleMode.kBrake
+        self.inverted = False
+        self.encoder = None
+        self.pid = SimSparkPIDController(self.device)
+        # soft limits by direction, and the directions enabled
+        self.soft_limits = {}
+        self.soft_limits_enabled = set()
+
+    def set(self, speed: float) -> None:
+        self.pid.reference = None
+        self.output = speed
+        FrameLog.record(self.device, COMMAND, "duty_cycle", speed)
+        super().set(speed)
+
+    def setVoltage(self, volts: float) -> None:
+        self.pid.reference = None
+        self.output = volts / wpilib.RobotController.getBatteryVoltage()
+        FrameLog.record(self.device, COMMAND, "voltage", volts)
+        super().setVoltage(volts)
+
+    def stopMotor(self) -> None:
+        self.pid.reference = None
+        self.output = 0.0
+        FrameLog.record(self.device, COMMAND, "duty_cycle", 0.0)
+        super().stopMotor()
+
+    def get(self) -> float:
+        output = self.output
+        encoder = self.getEncoder()
+        position = encoder.getPosition()
+        if self.pid.reference is not None:
+            output = self.pid.get_output(position, encoder.getVelocity())
+        direction = (
+            CANSparkBase.SoftLimitDirection.kForward
+            if output > 0
+            else CANSparkBase.SoftLimitDirection.kReverse
+        )
+        if direction in self.soft_limits_enabled:
+            limit = self.soft_limits.get(direction, 0.0)
+            if (output > 0 and position >= limit) or (output < 0 and position <= limit):
+                return 0.0
+        return output
+
+    def setSoftLimit(self, direction: CANSparkBase.SoftLimitDirection, limit: float):
+        FrameLog.record(self.device, CONFIG, "soft_limit", (direction, limit))
+        self.soft_limits[direction] = limit
+        return super().setSoftLimit(direction, limit)
+
+    def enableSoftLimit(self, direction: CANSparkBase.SoftLimitDirection, enable: bool):
+        FrameLog.record(self.device, CONFIG, "soft_limit_enabled", (direction, enable))
+        if enable:
+            self.soft_limits_enabled.add(direction)
+        else:
+            self.soft_limits_enabled.discard(direction)
+        return super().enableSoftLimit(direction, enable)
+
+    def getPIDController(self) -> SimSparkPIDController:
+        return self.pid
+
+    def setIdleMode(self, mode: CANSparkBase.IdleMode):
+        self.idle_mode = mode
+        FrameLog.record(self.device, CONFIG, "idle_mode", mode)
+        return super().setIdleMode(mode)
+
+    def getIdleMode(self) -> CANSparkBase.IdleMode:
+        return self.idle_mode
+
+    def setInverted(self, isInverted: bool) -> None:
+        self.inverted = isInverted
+        FrameLog.record(self.device, CONFIG, "inverted", isInverted)
+        super().setInverted(isInverted)
+
+    def getInverted(self) -> bool:
+        return self.inverted
+
+    def getEncoder(self, *args) -> SimRelativeEncoder:
+        # the same encoder is returned every time, as with hardware
+        if self.encoder is None:
+            self.encoder = SimRelativeEncoder(super().getEncoder(*args), self.device)
+        return self.encoder
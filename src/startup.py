@@ -0,0 +1,106 @@
+"""Profiling of the robot code's startup, to find what keeps it from
+coming up quickly after a reboot. `profile` records:
+
+imports -- the time spent importing each module, not counting the
+    modules it imports in turn, from `start_imports()` until
+    `stop_imports()`. Modules loaded with `importlib` are not seen.
+sections -- the time spent in each section timed with `section()` or
+    `timed()`, such as `createObjects()`, loading the autonomous modes,
+    and each component's creation and `setup()`
+
+`report()` prints the slowest of each and publishes all of them to
+NetworkTables under `/startup`, in seconds.
+"""
+
+import builtins
+import contextlib
+import functools
+import sys
+import threading
+import time
+
+from ntcore import NetworkTableInstance
+
+
+class StartupProfile:
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.imports = {}
+        self.sections = {}
+        # time spent in the imports made by each import in progress
+        self._stack = []
+        self._import = None
+        self._thread = None
+
+    def start_imports(self) -> None:
+        """Times the imports made on this thread from now on"""
+        if self._import is not None:
+            return
+        self._import = builtins.__import__
+        self._thread = threading.get_ident()
+        builtins.__import__ = self._timed_import
+
+    def stop_imports(self) -> None:
+        if self._import is None:
+            return
+        builtins.__import__ = self._import
+        self._import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # only modules that are not loaded yet are timed
+        if level != 0 or name in sys.modules or threading.get_ident() != self._thread:
+            return self._import(name, globals, locals, fromlist, level)
+        start = time.perf_counter()
+        self._stack.append(0.0)
+        try:
+            return self._import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            self.imports[name] = elapsed - children
+
+    @contextlib.contextmanager
+    def section(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections[name] = time.perf_counter() - start
+
+    def timed(self, name: str):
+        """Decorator that times each call of a function as section
+        `name`
+        """
+
+        def decorator(f):
+            @functools.wraps(f)
+            def wrapper(*args, **kwargs):
+                with self.section(name):
+                    return f(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def report(self, count: int = 10) -> None:
+        total = time.perf_counter() - self.start_time
+        print(f"Robot code started in {total:.3f} s")
+        for title, times in (("imports", self.imports), ("sections", self.sections)):
+            slowest = sorted(times.items(), key=lambda item: item[1], reverse=True)
+            print(f"  slowest {title} ({sum(times.values()):.3f} s in total):")
+            for name, seconds in slowest[:count]:
+                print(f"    {name:<40} {seconds * 1000:8.1f} ms")
+        self.publish(total)
+
+    def publish(self, total: float) -> None:
+        table = NetworkTableInstance.getDefault().getTable("startup")
+        table.putNumber("total", total)
+        for title, times in (("imports", self.imports), ("sections", self.sections)):
+            subtable = table.getSubTable(title)
+            for name, seconds in times.items():
+                subtable.putNumber(name, seconds)
+
+
+profile = StartupProfile()
@@ -0,0 +1,236 @@
+"""SysId-style characterization of the drivetrain, the intake arm and the
+shooter flywheels. In test mode, the mechanism and test chosen on the
+dashboard (`SysId Mechanism` and `SysId Test`) are run:
+
+    quasistatic -- voltage ramped up at `RAMP_RATE` (V/s)
+    dynamic -- a step to `STEP_VOLTAGE` (V)
+
+each forwards or in reverse. Voltage, position and velocity are sampled
+every `PERIOD` seconds by a Notifier into preallocated arrays, which are
+saved to `sysid/<mechanism>-<test>-<time>.npz` in the operating
+directory when the robot is disabled. Fit the feedforward gains from the
+saved runs of a mechanism with:
+
+    python sysid.py FILE ...
+
+Units are meters for the drivetrain, radians from horizontal for the
+intake arm and rotations for the shooter.
+"""
+
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+import wpilib
+
+PERIOD = 0.005
+RAMP_RATE = 0.25
+STEP_VOLTAGE = 4.0
+# longest a test runs before it is stopped (s)
+MAX_DURATION = 20.0
+TESTS = [
+    "quasistatic-forward",
+    "quasistatic-reverse",
+    "dynamic-forward",
+    "dynamic-reverse",
+]
+
+
+class DrivetrainMechanism:
+    """Both sides of the drivetrain driven straight"""
+
+    name = "drivetrain"
+    gravity = None
+
+    def __init__(self, robot):
+        self.drivetrain = robot.drivetrain
+        self.left_encoder = self.drivetrain.left_encoder
+        self.right_encoder = self.drivetrain.right_encoder
+
+    def apply(self, voltage: float) -> None:
+        self.drivetrain.left_motor_controller_group.setVoltage(voltage)
+        self.drivetrain.right_motor_controller_group.setVoltage(voltage)
+        self.drivetrain.drive.feed()
+
+    def sample(self) -> tuple[float, float]:
+        # the right side is inverted, so its encoders count backwards
+        return (
+            (self.left_encoder.getPosition() - self.right_encoder.getPosition()) / 2,
+            (self.left_encoder.getVelocity() - self.right_encoder.getVelocity()) / 2,
+        )
+
+
+class IntakeMechanism:
+    """The intake arm, which is stopped at its limits. Positive voltage
+    raises it. Its encoders have no velocity, so velocity is found from
+    position when fitting.
+    """
+
+    name = "intake"
+    gravity = "arm"
+
+    def __init__(self, robot):
+        self.intake = robot.intake
+        # the last position sampled, which the limits are checked against
+        self.position = self.intake.measure_position()
+
+    def apply(self, voltage: float) -> None:
+        intake = self.intake
+        if voltage > 0 and intake.is_position_past(self.position, intake.lower_limit):
+            voltage = 0
+        if voltage < 0 and intake.is_position_past(self.position, intake.upper_limit):
+            voltage = 0
+        intake.joint_motor_group.setVoltage(voltage)
+
+    def sample(self) -> tuple[float, float]:
+        self.position = self.intake.measure_position()
+        if self.position is None:
+            return math.nan, math.nan
+        return self.intake.to_radians(self.position), math.nan
+
+
+class ShooterMechanism:
+    """The shooter flywheels"""
+
+    name = "shooter"
+    gravity = None
+
+    def __init__(self, robot):
+        self.shooter = robot.shooter
+        self.encoder = self.shooter.shooter_left_motor.getEncoder()
+
+    def apply(self, voltage: float) -> None:
+        self.shooter.shooter_motor_group.setVoltage(voltage)
+
+    def sample(self) -> tuple[float, float]:
+        # the encoder reports rotations and RPM
+        return self.encoder.getPosition(), self.encoder.getVelocity() / 60
+
+
+MECHANISMS = {
+    mechanism.name: mechanism
+    for mechanism in (DrivetrainMechanism, IntakeMechanism, ShooterMechanism)
+}
+
+
+class Characterization:
+    """Runs one test on a mechanism from a Notifier, recording a sample
+    each `PERIOD` seconds until `stop()` is called
+    """
+
+    def __init__(self, mechanism, test: str):
+        self.mechanism = mechanism
+        self.test = test
+        self.direction = 1 if test.endswith("forward") else -1
+        self.quasistatic = test.startswith("quasistatic")
+        size = int(MAX_DURATION / PERIOD) + 1
+        self.times = np.zeros(size)
+        self.voltages = np.zeros(size)
+        self.positions = np.zeros(size)
+        self.velocities = np.zeros(size)
+        self.count = 0
+        self.start_time = 0.0
+        self.notifier = wpilib.Notifier(self.run)
+
+    def start(self) -> None:
+        self.count = 0
+        self.start_time = wpilib.Timer.getFPGATimestamp()
+        self.notifier.startPeriodic(PERIOD)
+
+    def run(self) -> None:
+        now = wpilib.Timer.getFPGATimestamp()
+        elapsed = now - self.start_time
+        if self.count == len(self.times):
+            self.mechanism.apply(0)
+            return
+        if self.quasistatic:
+            voltage = self.direction * RAMP_RATE * elapsed
+        else:
+            voltage = self.direction * STEP_VOLTAGE
+        position, velocity = self.mechanism.sample()
+        self.mechanism.apply(voltage)
+        i = self.count
+        self.times[i] = now
+        self.voltages[i] = voltage
+        self.positions[i] = position
+        self.velocities[i] = velocity
+        self.count += 1
+
+    def stop(self) -> None:
+        self.notifier.stop()
+        self.mechanism.apply(0)
+
+    def save(self) -> str:
+        """Saves the samples and returns the path they were saved to"""
+        directory = os.path.join(wpilib.getOperatingDirectory(), "sysid")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(
+            directory,
+            f"{self.mechanism.name}-{self.test}-{time.strftime('%Y%m%d-%H%M%S')}.npz",
+        )
+        n = self.count
+        np.savez(
+            path,
+            mechanism=self.mechanism.name,
+            gravity=str(self.mechanism.gravity),
+            test=self.test,
+            time=self.times[:n],
+            voltage=self.voltages[:n],
+            position=self.positions[:n],
+            velocity=self.velocities[:n],
+        )
+        return path
+
+
+def make_chooser(options: list[str]) -> wpilib.SendableChooser:
+    chooser = wpilib.SendableChooser()
+    chooser.setDefaultOption(options[0], options[0])
+    for option in options[1:]:
+        chooser.addOption(option, option)
+    return chooser
+
+
+def fit(runs: list[dict]) -> dict[str, float]:
+    """Fits kS, kV, kA (and kG for an arm or elevator) to the saved
+    `runs` of one mechanism by least squares on
+        V = kS sgn(v) + kV v + kA a [+ kG or kG cos(position)]
+    Samples at rest or with no position are left out.
+    """
+    rows = []
+    voltages = []
+    gravity = str(runs[0]["gravity"])
+    for run in runs:
+        t = run["time"]
+        position = run["position"]
+        velocity = run["velocity"]
+        if np.isnan(velocity).all():
+            velocity = np.gradient(position, t)
+        acceleration = np.gradient(velocity, t)
+        columns = [np.sign(velocity), velocity, acceleration]
+        if gravity == "arm":
+            columns.append(np.cos(position))
+        elif gravity == "elevator":
+            columns.append(np.ones_like(velocity))
+        data = np.column_stack(columns)
+        keep = np.isfinite(data).all(axis=1) & (np.abs(velocity) > 1e-3)
+        rows.append(data[keep])
+        voltages.append(run["voltage"][keep])
+    gains, *_ = np.linalg.lstsq(np.vstack(rows), np.concatenate(voltages), rcond=None)
+    names = ["kS", "kV", "kA", "kG"]
+    return {name: float(gain) for name, gain in zip(names, gains)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fits feedforward gains")
+    parser.add_argument("files", nargs="+", help="runs of a single mechanism")
+    args = parser.parse_args()
+
+    runs = [dict(np.load(path)) for path in args.files]
+    for name, gain in fit(runs).items():
+        print(f"{name} = {gain:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,3 +6,22 @@
 from pyfrc.tests import *
 
 # from robotpy_ext.autonomous.selector_tests import *
+
+from sim.clock import SimClock
+
+
+def test_full_match(control, robot):
+    """Steps through a whole match with a fixed timestep, which takes a
+    few seconds rather than the length of a match. Autonomous drives off
+    the line with the Leave mode.
+    """
+    with control.run_robot():
+        automodes = robot._automodes
+        leave = automodes.modes["Leave"]
+        automodes.chooser.setDefaultOption(leave.MODE_NAME, leave)
+
+        SimClock(seed=5113).run_match()
+
+        states = [state for state, _ in leave.tracer.get_transitions()]
+        assert states[:2] == ["leaving", "stopped"]
+        assert robot.drivetrain.get_pose().translation().norm() > 0.5
@@ -0,0 +1,56 @@
+import math
+
+import numpy as np
+import pytest
+
+import datalog
+from loganalysis import MappedLog
+
+
+def write_log(path):
+    writer = datalog.DataLogWriter(str(path))
+    double = writer.start("a/double", "double")
+    array = writer.start("a/array", "double[]")
+    string = writer.start("a/string", "string")
+    for i in range(100):
+        writer.append_double(double, i * 0.5, 1000 * i)
+        if i % 10 == 0:
+            writer.append_double_array(array, [i, math.nan, -i], 1000 * i)
+            writer.append_string(string, f"state{i}", 1000 * i)
+    writer.close()
+    assert writer.dropped == 0
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "test.wpilog"
+    write_log(path)
+
+    signals = datalog.read_log(str(path))
+    assert signals["a/double"][1] == [i * 0.5 for i in range(100)]
+
+    with MappedLog(str(path)) as log:
+        timestamps, values = log.get("a/double")
+        np.testing.assert_array_equal(timestamps, np.arange(100) * 1000)
+        np.testing.assert_array_equal(values, np.arange(100) * 0.5)
+
+        timestamps, values, lengths = log.get_arrays("a/array")
+        assert list(lengths) == [3] * 10
+        np.testing.assert_array_equal(values[::3], np.arange(0, 100, 10))
+        assert np.isnan(values[1::3]).all()
+
+        timestamps, strings = log.get_strings("a/string")
+        assert strings == [f"state{i}" for i in range(0, 100, 10)]
+        del timestamps, values, lengths
+
+
+def test_view_keeps_map_open(tmp_path):
+    path = tmp_path / "test.wpilog"
+    write_log(path)
+
+    log = MappedLog(str(path))
+    _, values = log.get("a/double")
+    with pytest.raises(BufferError):
+        log.close()
+    assert values[-1] == 49.5
+    del values
+    log.close()
@@ -0,0 +1,135 @@
+from magicbot import StateMachine, AutonomousStateMachine
+from magicbot.state_machine import _State
+from ntcore import NetworkTableInstance
+import wpilib
+
+
+class StateTracer:
+    """Records the transitions of a state machine in a preallocated ring
+    buffer and keeps running dwell-time statistics for each state. The
+    statistics are published to NetworkTables under `/tracing/<name>`
+    each time the state changes, so nothing is sent while a state is
+    being held.
+    """
+
+    def __init__(self, name: str, state_names: list[str], size: int = 128):
+        """Parameters:
+        name -- name of the subtable statistics are published to
+        state_names -- names of every state of the state machine
+        size -- number of transitions kept in the ring buffer
+        """
+        self.state_names = state_names
+        self.indices = {state: i for i, state in enumerate(state_names)}
+        self.size = size
+        # transitions are stored as state indices, with -1 meaning that
+        # the state machine stopped executing
+        self.buffer_states = [-1] * size
+        self.buffer_times = [0.0] * size
+        self.head = 0
+        self.count = 0
+        self.dwell_counts = [0] * len(state_names)
+        self.dwell_totals = [0.0] * len(state_names)
+        self.dwell_maxes = [0.0] * len(state_names)
+        self.state = -1
+        self.entered = 0.0
+
+        table = NetworkTableInstance.getDefault().getTable("tracing").getSubTable(name)
+        table.getStringArrayTopic("states").publish().set(state_names)
+        self.transition_pub = table.getDoubleArrayTopic("transition").publish()
+        self.count_pub = table.getIntegerArrayTopic("dwell_count").publish()
+        self.mean_pub = table.getDoubleArrayTopic("dwell_mean").publish()
+        self.max_pub = table.getDoubleArrayTopic("dwell_max").publish()
+
+    def record(self, state_name: str, time: float) -> None:
+        """Call this whenever the state might have changed. Repeated
+        calls with the current state are ignored.
+        """
+        state = self.indices.get(state_name, -1)
+        if state == self.state:
+            return
+        if self.state != -1:
+            dwell = time - self.entered
+            self.dwell_counts[self.state] += 1
+            self.dwell_totals[self.state] += dwell
+            if dwell > self.dwell_maxes[self.state]:
+                self.dwell_maxes[self.state] = dwell
+        self.buffer_states[self.head] = state
+        self.buffer_times[self.head] = time
+        self.head = (self.head + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        self.state = state
+        self.entered = time
+        self.publish()
+
+    def publish(self) -> None:
+        self.transition_pub.set([self.state, self.entered])
+        self.count_pub.set(self.dwell_counts)
+        self.mean_pub.set(self.get_dwell_means())
+        self.max_pub.set(self.dwell_maxes)
+
+    def get_transitions(self) -> list[tuple[str, float]]:
+        """Returns the buffered transitions, oldest first, as pairs of
+        state name (empty if the state machine stopped) and timestamp
+        """
+        transitions = []
+        for i in range(self.head - self.count, self.head):
+            state = self.buffer_states[i % self.size]
+            name = "" if state == -1 else self.state_names[state]
+            transitions.append((name, self.buffer_times[i % self.size]))
+        return transitions
+
+    def get_dwell_means(self) -> list[float]:
+        return [
+            total / count if count > 0 else 0.0
+            for total, count in zip(self.dwell_totals, self.dwell_counts)
+        ]
+
+    def get_dwell_stats(self) -> dict[str, tuple[int, float, float]]:
+        """Returns the number of visits, total time, and longest time
+        spent in each state that has been left at least once
+        """
+        return {
+            name: (count, total, longest)
+            for name, count, total, longest in zip(
+                self.state_names,
+                self.dwell_counts,
+                self.dwell_totals,
+                self.dwell_maxes,
+            )
+            if count > 0
+        }
+
+
+class TracingMixin:
+    """Adds a `StateTracer` to a magicbot state machine. Transitions
+    are recorded from `next_state()` and `done()`, so states changed by
+    `engage()` and by expiring timed states are traced as well.
+    """
+
+    def __init__(self):
+        super().__init__()
+        name = getattr(self, "MODE_NAME", type(self).__name__)
+        state_names = [
+            member
+            for member in dir(type(self))
+            if isinstance(getattr(type(self), member), _State)
+        ]
+        self.tracer = StateTracer(name, state_names)
+
+    def next_state(self, state) -> None:
+        super().next_state(state)
+        if isinstance(state, _State):
+            state = state.name
+        self.tracer.record(state, wpilib.Timer.getFPGATimestamp())
+
+    def done(self) -> None:
+        super().done()
+        self.tracer.record("", wpilib.Timer.getFPGATimestamp())
+
+
+class TracedStateMachine(TracingMixin, StateMachine):
+    pass
+
+
+class TracedAutonomousStateMachine(TracingMixin, AutonomousStateMachine):
+    pass
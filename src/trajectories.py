@@ -0,0 +1,186 @@
+"""Generates trajectories for the `follow` routine action and caches
+them in the deploy directory, so that the robot loads them from disk
+instead of generating them.
+
+A trajectory is described by its parameters:
+    waypoints -- list of [x (m), y (m), heading (degrees)], relative to
+        the pose of the robot when it starts following the trajectory
+    max_velocity -- (m/s)
+    max_acceleration -- (m/s^2)
+    reversed -- drive the trajectory backwards
+
+Routines load their trajectories with `prefetch()`, on a background
+thread, once their mode is chosen rather than at boot.
+
+Each cached trajectory is stored in `<hash of parameters>.traj` as a
+header followed by one record of seven float32 per state (time,
+velocity, acceleration, x, y, heading, curvature). Run this file after
+changing a routine to regenerate the cache:
+
+    python trajectories.py
+"""
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import struct
+
+import wpilib
+from wpimath.geometry import Pose2d, Rotation2d
+from wpimath.trajectory import Trajectory, TrajectoryConfig, TrajectoryGenerator
+from wpimath.trajectory.constraint import DifferentialDriveKinematicsConstraint
+
+from components.drivetrain import Drivetrain
+
+# bumped whenever the generator or file format changes, which
+# invalidates every cached trajectory
+VERSION = 1
+MAGIC = b"TRAJ"
+HEADER = struct.Struct("<4sI")
+STATE = struct.Struct("<7f")
+
+_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="trajectories"
+)
+# trajectories loading or loaded by `prefetch()`, by key
+_futures = {}
+
+
+def get_directory() -> str:
+    return os.path.join(wpilib.getDeployDirectory(), "trajectories")
+
+
+def get_key(params: dict) -> str:
+    """Returns the hash of the parameters the trajectory is generated
+    from. Keys of the step that do not describe the trajectory (such as
+    `action`) are ignored.
+    """
+    description = {
+        "version": VERSION,
+        "waypoints": params["waypoints"],
+        "max_velocity": params["max_velocity"],
+        "max_acceleration": params["max_acceleration"],
+        "reversed": params.get("reversed", False),
+    }
+    encoded = json.dumps(description, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def generate(params: dict) -> Trajectory:
+    config = TrajectoryConfig(params["max_velocity"], params["max_acceleration"])
+    config.setReversed(params.get("reversed", False))
+    # keeps the outside wheels under `max_velocity` through turns
+    config.addConstraint(
+        DifferentialDriveKinematicsConstraint(
+            Drivetrain.kinematics, params["max_velocity"]
+        )
+    )
+    waypoints = [
+        Pose2d(x, y, Rotation2d.fromDegrees(heading))
+        for x, y, heading in params["waypoints"]
+    ]
+    return TrajectoryGenerator.generateTrajectory(waypoints, config)
+
+
+def save(path: str, trajectory: Trajectory) -> None:
+    states = trajectory.states()
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(states)))
+        for s in states:
+            f.write(
+                STATE.pack(
+                    s.t,
+                    s.velocity,
+                    s.acceleration,
+                    s.pose.X(),
+                    s.pose.Y(),
+                    s.pose.rotation().radians(),
+                    s.curvature,
+                )
+            )
+
+
+def load(path: str) -> Trajectory:
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, count = HEADER.unpack_from(data)
+    if magic != MAGIC or len(data) != HEADER.size + count * STATE.size:
+        raise ValueError(f"Not a trajectory file: {path}")
+    return Trajectory(
+        [
+            Trajectory.State(t, v, a, Pose2d(x, y, heading), curvature)
+            for t, v, a, x, y, heading, curvature in STATE.iter_unpack(
+                data[HEADER.size :]
+            )
+        ]
+    )
+
+
+def get(params: dict, directory: str = None) -> Trajectory:
+    """Loads the trajectory described by `params` from the cache,
+    generating and caching it if it is missing
+    """
+    if directory is None:
+        directory = get_directory()
+    path = os.path.join(directory, get_key(params) + ".traj")
+    if os.path.exists(path):
+        return load(path)
+    print(f"Trajectory not cached, generating it (run trajectories.py): {path}")
+    trajectory = generate(params)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        save(path, trajectory)
+    except OSError:
+        pass
+    return trajectory
+
+
+def prefetch(params: dict) -> concurrent.futures.Future:
+    """Starts loading the trajectory described by `params` on a
+    background thread, unless it is loading or loaded already. Returns a
+    future of the trajectory.
+    """
+    key = get_key(params)
+    if key not in _futures:
+        _futures[key] = _executor.submit(get, params)
+    return _futures[key]
+
+
+def find_params(steps: list[dict]) -> list[dict]:
+    """Returns the parameters of every trajectory followed in `steps`"""
+    params = []
+    for step in steps:
+        if step["action"] == "follow":
+            params.append(step)
+        elif step["action"] == "parallel":
+            params.extend(find_params(step["actions"]))
+    return params
+
+
+def main():
+    """Regenerates the cache from the routines in the deploy directory,
+    removing cached trajectories no longer used by any routine
+    """
+    directory = get_directory()
+    os.makedirs(directory, exist_ok=True)
+    routines = os.path.join(wpilib.getDeployDirectory(), "routines")
+    used = set()
+    for filename in sorted(os.listdir(routines)):
+        if not filename.endswith(".json"):
+            continue
+        with open(os.path.join(routines, filename)) as f:
+            steps = json.load(f)["steps"]
+        for params in find_params(steps):
+            key = get_key(params)
+            used.add(key + ".traj")
+            trajectory = generate(params)
+            save(os.path.join(directory, key + ".traj"), trajectory)
+            print(f"{filename}: {key} ({trajectory.totalTime():.2f} s)")
+    for filename in os.listdir(directory):
+        if filename.endswith(".traj") and filename not in used:
+            os.remove(os.path.join(directory, filename))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from enum import Enum
 from typing import Callable
+import bisect
 import math
 
 from wpilib.interfaces import MotorController
@@ -121,6 +122,49 @@ def cubic_curve(
     return curve(lambda x: scalar * x**3, offset, deadband, max_mag, absolute_offset)
 
 
+class LookupTable:
+    """Table of rows keyed by their first value (eg. a distance) that
+    linearly interpolates between neighbouring rows. Keys outside of
+    the range of the table are not extrapolated.
+    """
+
+    def __init__(self, rows: list[tuple[float, ...]]):
+        self.rows = sorted(rows)
+        self.keys = [row[0] for row in self.rows]
+
+    @classmethod
+    def from_csv(cls, path: str) -> "LookupTable":
+        """Loads a table from a file of comma separated values. Blank
+        lines and lines starting with `#` are skipped.
+        """
+        rows = []
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if len(line) == 0 or line.startswith("#"):
+                    continue
+                rows.append(tuple(float(value) for value in line.split(",")))
+        return cls(rows)
+
+    def contains(self, key: float) -> bool:
+        """Returns `True` if `key` is within the range of the table"""
+        return len(self.keys) > 0 and self.keys[0] <= key <= self.keys[-1]
+
+    def get(self, key: float) -> tuple[float, ...] | None:
+        """Returns the values (excluding the key) of the row at `key`,
+        interpolating if needed, or `None` if `key` is out of range
+        """
+        if not self.contains(key):
+            return None
+        i = bisect.bisect_left(self.keys, key)
+        if self.keys[i] == key:
+            return self.rows[i][1:]
+        low = self.rows[i - 1]
+        high = self.rows[i]
+        t = (key - low[0]) / (high[0] - low[0])
+        return tuple(a + (b - a) * t for a, b in zip(low[1:], high[1:]))
+
+
 class EmptyController(MotorController):
     """Dummy class that implements wpilib MotorController.
     Only use this for testing.